@@ -0,0 +1,92 @@
+# Applies manifests written by PlanManifest.py or the dialogs' "Export Plan..." buttons in mayapy:
+#
+#   mayapy ApplyManifest.py D:/plans/wood.json D:/plans/metal.json -o D:/shaders
+#   mayapy ApplyManifest.py D:/plans/fabrics.json --scene D:/ShaderBall/ShaderBall.ma --scene D:/shots/a.ma -o D:/shaders
+#
+# The manifests are read once and applied to every --scene, which is saved to the output folder
+# under its own name, or in place without --output. Without --scene they are applied to a new
+# scene that is saved as <output>/<name of the first manifest>.ma (or .mb). Every plan is applied
+# with ScenePlan.applyPlan, so each plan is created in one pass.
+
+import argparse
+import os
+import sys
+import traceback
+
+import Instrument
+from ScenePlan import readManifest, applyPlan
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Create the nodes, connections and render layers of scene plan manifests in mayapy.")
+    parser.add_argument("manifests", nargs="+", help="json or msgpack manifests, applied in the given order")
+    parser.add_argument("--scene", action="append", default=[], help="scene to apply the manifests to, can be given several times")
+    parser.add_argument("-o", "--output", help="folder to save the scenes to, required without --scene")
+    parser.add_argument("--format", choices=["ma", "mb"], default="ma", help="format of new scenes (default: ma)")
+    options = parser.parse_args(argv)
+    if not options.scene and not options.output:
+        parser.error("--output is required when no --scene is given")
+    return options
+
+
+def applyManifests(manifests, pm=None):
+    # applies the plans of all manifests to the open scene, returns the number of created nodes
+    created = 0
+    for manifest in manifests:
+        for plan in manifest["plans"]:
+            applyPlan(plan, pm)
+            created += len(plan.nodes) + len(plan.shading_groups)
+    return created
+
+
+def scenePath(scene, options):
+    # where a scene is saved, None for a new scene
+    if scene is None:
+        name = os.path.splitext(os.path.basename(options.manifests[0]))[0]
+        return os.path.join(options.output, name + "." + options.format)
+    if options.output:
+        return os.path.join(options.output, os.path.basename(scene))
+    return scene
+
+
+def main(argv=None):
+    options = parseArguments(argv)
+    if options.output and not os.path.isdir(options.output):
+        os.makedirs(options.output)
+
+    failed = []
+    with Instrument.run("ApplyManifest"):
+        # read before Maya starts, a broken manifest fails right away
+        with Instrument.stage("read"):
+            manifests = [readManifest(path) for path in options.manifests]
+
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+        import pymel.core as pm
+        try:
+            for scene in options.scene or [None]:
+                try:
+                    if scene is None:
+                        pm.newFile(force=True)
+                    else:
+                        pm.openFile(scene, force=True)
+                    created = applyManifests(manifests, pm)
+                    output = scenePath(scene, options)
+                    with Instrument.stage("save scene", commands=1):
+                        pm.saveAs(output, force=True, type="mayaBinary" if output.lower().endswith(".mb") else "mayaAscii")
+                    print("{0} nodes -> {1}".format(created, output))
+                except Exception:
+                    # keep going, one broken scene shouldn't stop the others
+                    traceback.print_exc()
+                    failed.append(scene or "new scene")
+        finally:
+            maya.standalone.uninitialize()
+
+    if failed:
+        sys.stderr.write("{0} scenes failed:\n  {1}\n".format(len(failed), "\n  ".join(failed)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# Index of the asset folders the tools can import, like ShaderBall/ShaderBall.json.
+#
+# Every folder below the asset roots that contains a manifest named after the folder is an asset.
+# The roots come from $PRODUCT_REPLACEMENT_ASSET_ROOTS (separated by os.pathsep) and default to this
+# repository, which ships the ShaderBall asset. The index is built by one walk over the roots, kept in memory and
+# stored in the user's home folder, so looking up an asset is a dict access plus one stat of its
+# manifest to see whether it changed. refresh() walks the roots again, for new or removed assets.
+
+import os
+import json
+import collections
+
+from ScanCache import saveJson
+
+default_index_path = os.path.join(os.path.expanduser("~"), ".productReplacement", "assetIndex.json")
+index_version = 2
+
+# field -> (type, required)
+manifest_fields = collections.OrderedDict([
+    ("maPath", (str, True)),
+    ("textureFiles", (list, True)),
+    ("thumbPath", (str, False)),
+    ("proxyPath", (str, False)),
+])
+
+try:
+    string_types = (str, unicode)
+except NameError:
+    string_types = (str,)
+
+
+class ManifestError(ValueError):
+    pass
+
+
+class Asset(object):
+    __slots__ = ("name", "folder", "manifest_path", "mtime", "ma_path", "texture_files", "thumb_path", "proxy_path")
+
+    def __init__(self, name, folder, manifest_path, mtime, manifest):
+        self.name = name
+        self.folder = folder
+        self.manifest_path = manifest_path
+        self.mtime = mtime
+        self.ma_path = manifest["maPath"]
+        self.texture_files = list(manifest["textureFiles"])
+        self.thumb_path = manifest.get("thumbPath")
+        self.proxy_path = manifest.get("proxyPath")
+
+    def __repr__(self):
+        return "Asset({0!r}, {1!r})".format(self.name, self.folder)
+
+    def path(self, relative_path):
+        # absolute path of a file named in the manifest
+        return os.path.join(self.folder, relative_path)
+
+    def toDict(self):
+        manifest = {"maPath": self.ma_path, "textureFiles": self.texture_files}
+        if self.thumb_path is not None:
+            manifest["thumbPath"] = self.thumb_path
+        if self.proxy_path is not None:
+            manifest["proxyPath"] = self.proxy_path
+        return {"folder": self.folder, "manifest_path": self.manifest_path, "mtime": self.mtime, "manifest": manifest}
+
+
+def manifestPath(folder):
+    return os.path.join(folder, os.path.basename(os.path.normpath(folder)) + ".json")
+
+
+def validateManifest(manifest, manifest_path=""):
+    # Raises ManifestError when a field is missing or has the wrong type
+    if not isinstance(manifest, dict):
+        raise ManifestError("{0}: the manifest is not a json object".format(manifest_path))
+    for field, (field_type, required) in manifest_fields.items():
+        if field not in manifest:
+            if required:
+                raise ManifestError("{0}: '{1}' is missing".format(manifest_path, field))
+            continue
+        value = manifest[field]
+        if field_type is str:
+            valid = isinstance(value, string_types)
+        else:
+            valid = isinstance(value, list) and all(isinstance(item, string_types) for item in value)
+        if not valid:
+            raise ManifestError("{0}: '{1}' should be {2}".format(
+                manifest_path, field, "a string" if field_type is str else "a list of strings"))
+    return manifest
+
+
+def readAsset(folder):
+    # Reads and validates the manifest of the asset in folder
+    manifest_path = manifestPath(folder)
+    mtime = os.stat(manifest_path).st_mtime
+    with open(manifest_path, "r") as json_file:
+        try:
+            manifest = json.load(json_file)
+        except ValueError as error:
+            raise ManifestError("{0}: {1}".format(manifest_path, error))
+    validateManifest(manifest, manifest_path)
+    return Asset(os.path.basename(os.path.normpath(folder)), folder, manifest_path, mtime, manifest)
+
+
+def findAssetFolders(root):
+    # Folders below root with a manifest named after the folder. Assets don't contain other assets,
+    # so the walk doesn't descend into them.
+    for folder, folders, files in os.walk(root):
+        if os.path.basename(manifestPath(folder)) in files:
+            folders[:] = []
+            yield folder
+        else:
+            folders[:] = sorted(name for name in folders if not name.startswith("."))
+
+
+def defaultRoots():
+    roots = os.environ.get("PRODUCT_REPLACEMENT_ASSET_ROOTS")
+    if roots:
+        return [root for root in roots.split(os.pathsep) if root]
+    return [os.path.dirname(os.path.abspath(__file__))]
+
+
+class AssetRegistry(object):
+    def __init__(self, roots=None, index_path=None):
+        self.roots = [os.path.normpath(root) for root in (roots or defaultRoots())]
+        self.index_path = index_path or os.environ.get("PRODUCT_REPLACEMENT_ASSET_INDEX", default_index_path)
+        self.errors = []    # messages of the manifests that were skipped
+        self._assets = None
+
+    def get(self, name):
+        # Returns the asset called name, re-reading its manifest only when it changed on disk.
+        # Assets that are not in the index, or whose manifest is gone, make the registry walk the roots again.
+        asset = self._load().get(name)
+        if asset is not None:
+            try:
+                mtime = os.stat(asset.manifest_path).st_mtime
+            except OSError:
+                asset = None
+            else:
+                if mtime != asset.mtime:
+                    asset = self._assets[name] = readAsset(asset.folder)
+                    self.save()
+        if asset is None:
+            asset = self.refresh().get(name)
+        if asset is None:
+            raise KeyError("no asset called '{0}' below {1}".format(name, ", ".join(self.roots)))
+        return asset
+
+    def names(self):
+        return sorted(self._load())
+
+    def __contains__(self, name):
+        return name in self._load()
+
+    def refresh(self):
+        # Walks all roots again. The first root wins when two roots have an asset with the same name.
+        assets = {}
+        self.errors = []
+        for root in self.roots:
+            for folder in findAssetFolders(root):
+                name = os.path.basename(os.path.normpath(folder))
+                if name in assets:
+                    self.errors.append("{0}: duplicate of {1}".format(manifestPath(folder), assets[name].manifest_path))
+                    continue
+                try:
+                    assets[name] = readAsset(folder)
+                except ManifestError as error:
+                    self.errors.append(str(error))
+                except (IOError, OSError) as error:
+                    self.errors.append("{0}: {1}".format(manifestPath(folder), error))
+        self._assets = assets
+        self.save()
+        return assets
+
+    def save(self):
+        # an index that can't be written is just walked again next session, the assets still load
+        saveJson(self.index_path, {"version": index_version, "roots": self.roots,
+                                   "assets": dict((name, asset.toDict()) for name, asset in self._assets.items())})
+
+    def _load(self):
+        if self._assets is None:
+            try:
+                with open(self.index_path, "r") as json_file:
+                    data = json.load(json_file)
+                if data.get("version") == index_version and data.get("roots") == self.roots:
+                    self._assets = dict((name, Asset(name, entry["folder"], entry["manifest_path"], entry["mtime"], entry["manifest"]))
+                                        for name, entry in data["assets"].items())
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                # a missing or broken index is simply rebuilt
+                pass
+            if self._assets is None:
+                self.refresh()
+        return self._assets
+
+
+_asset_registry = None
+
+def getAssetRegistry():
+    # the registry shared by all tools in this Maya session
+    global _asset_registry
+    if _asset_registry is None:
+        _asset_registry = AssetRegistry()
+    return _asset_registry
@@ -0,0 +1,59 @@
+# Maya-free half of Import_AxF: a V-Ray AxfMaterial per AxF file and a render layer per material,
+# as a ScenePlan. PlanManifest.py uses it to write manifests without Maya.
+
+import os
+from ScenePlan import ScenePlan
+from ScanCache import getScanCache
+from TextureScan import listFiles
+import Instrument
+
+# objects every AxF render layer shows, SB_Blend gets the layer's material as base_material
+render_layer_members = ["SB_Blend", "CAMERA", "LIGHTS", "GEO"]
+
+def filterAxF(searchPath, use_cache=True):
+    # sorted AxF files in searchPath, without hidden files like the ._<name>.axf macOS leaves on shares
+    cache = getScanCache() if use_cache else None
+    axfs = cache.get("axf", searchPath) if cache is not None else None
+    if axfs is not None:
+        return axfs
+    axfs = []
+    for file in listFiles(searchPath):
+        extension = os.path.splitext(file)[-1][1:]
+        if extension.lower() == "axf":
+            axfs.append(file)
+    if cache is not None:
+        cache.put("axf", searchPath, axfs)
+    return axfs
+
+def planMaterials(search_path, use_cache=True, plan=None):
+    # an AxF_<file name> material per AxF file in search_path, pointing at the file, in file name order
+    plan = plan or ScenePlan()
+    plan.requirePlugin("vrayformaya")
+    with Instrument.stage("scan"):
+        axfs = filterAxF(search_path, use_cache)
+    for axf_file in axfs:
+        material = plan.addNode("AxF_" + axf_file[:-4], "AxfMaterial", asShader=True)
+        plan.setAttr(material, "AxFFilename", os.path.join(search_path, axf_file))
+    return plan
+
+def planRenderLayers(plan, materials):
+    # Replaces all render layers with one layer per material (by name), with a connection override that
+    # connects the material to SB_Blend
+    plan.replaceRenderLayers()
+    for i, material in enumerate(materials):
+        if not plan.hasNode(material):
+            plan.addExisting(material)
+        override = ["SB_Blend_{0}_override".format(i), "base_material", material, "outColor"]
+        plan.addRenderLayer("Maya_" + material, "AxF_{0}_collection".format(i), render_layer_members, [override])
+    return plan
+
+def planRenderSettings(plan):
+    # V-Ray renders one png per layer and camera of frame 0, the persp camera is left out
+    settings = [("perspShape", "renderable", 0), ("vraySettings", "giOn", 1), ("vraySettings", "imageFormatStr", "png"),
+                ("vraySettings", "fileNamePrefix", "<Camera>/<Scene>/<Layer>"), ("vraySettings", "width", 1280),
+                ("vraySettings", "height", 1024), ("defaultRenderGlobals", "endFrame", 0), ("defaultRenderGlobals", "startFrame", 0)]
+    for node, attribute, value in settings:
+        if not plan.hasNode(node):
+            plan.addExisting(node)
+        plan.setAttr(node, attribute, value)
+    return plan
@@ -0,0 +1,117 @@
+# Splits a list of libraries over several mayapy processes and assembles the results in one master scene:
+#
+#   python BatchDriver.py substance D:/libraries/* -o D:/shaders --jobs 8 --master library
+#
+# Every worker runs BatchImport.py on its share of the folders and saves it as <output>/slice_<n>.ma,
+# the master scene then references all slices. The driver itself doesn't need Maya, and the worker
+# command can be replaced (--worker-command) to test the scheduling with a stand-in script.
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+from multiprocessing.pool import ThreadPool
+
+batch_import = os.path.join(os.path.dirname(os.path.abspath(__file__)), "BatchImport.py")
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Build material libraries with several mayapy processes at once.")
+    parser.add_argument("tool", choices=["substance", "axf"], help="importer to run on the folders")
+    parser.add_argument("folders", nargs="+", help="folders with texture maps or AxF files")
+    parser.add_argument("-o", "--output", required=True, help="folder to write the scenes and logs to")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="number of mayapy processes (default: 4)")
+    parser.add_argument("--master", metavar="NAME", help="also write <output>/NAME.ma referencing all slices")
+    parser.add_argument("--format", choices=["ma", "mb"], default="ma", help="scene file format (default: ma)")
+    parser.add_argument("--mayapy", default=os.environ.get("MAYAPY", "mayapy"), help="mayapy executable (default: $MAYAPY or mayapy)")
+    parser.add_argument("--worker-command", help="command to run instead of '<mayapy> BatchImport.py'")
+    parser.add_argument("--scene", help="passed on to BatchImport.py")
+    parser.add_argument("--recursive", action="store_true", help="passed on to BatchImport.py")
+    parser.add_argument("--render-setup", action="store_true", help="passed on to BatchImport.py")
+    parser.add_argument("--renderer", help="passed on to BatchImport.py")
+    parser.add_argument("--resolution", help="passed on to BatchImport.py")
+    parser.add_argument("--convert", action="store_true", help="passed on to BatchImport.py")
+    parser.add_argument("--thumbnails", action="store_true", help="passed on to BatchImport.py")
+    return parser.parse_args(argv)
+
+
+def splitInputs(inputs, jobs):
+    # deals the inputs out round robin, so neighbouring (often similar sized) libraries end up in different slices
+    return [inputs[i::jobs] for i in range(min(jobs, len(inputs)))]
+
+
+def workerCommand(options):
+    if options.worker_command:
+        return shlex.split(options.worker_command, posix=os.name != "nt")
+    return [options.mayapy, batch_import]
+
+
+def sliceCommands(options, slices):
+    # Returns [(command, scene, log file)] with one BatchImport call per slice
+    commands = []
+    for i, folders in enumerate(slices):
+        name = "slice_{0:03d}".format(i)
+        command = workerCommand(options) + [options.tool] + folders + ["-o", options.output, "--combine", name, "--format", options.format]
+        if options.scene:
+            command += ["--scene", options.scene]
+        if options.recursive:
+            command.append("--recursive")
+        if options.render_setup:
+            command.append("--render-setup")
+        if options.renderer:
+            command += ["--renderer", options.renderer]
+        if options.resolution:
+            command += ["--resolution", options.resolution]
+        if options.convert:
+            command.append("--convert")
+        if options.thumbnails:
+            command.append("--thumbnails")
+        commands.append((command, os.path.join(options.output, name + "." + options.format), os.path.join(options.output, name + ".log")))
+    return commands
+
+
+def runCommand(job):
+    # runs one worker with its output going to a log file, returns the exit code
+    command, scene, log_path = job
+    with open(log_path, "w") as log_file:
+        return subprocess.call(command, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def runJobs(jobs, processes):
+    # runs the jobs with at most `processes` at the same time, returns the exit codes in order
+    pool = ThreadPool(processes)
+    try:
+        return pool.map(runCommand, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(argv=None):
+    options = parseArguments(argv)
+    if not os.path.isdir(options.output):
+        os.makedirs(options.output)
+
+    jobs = sliceCommands(options, splitInputs(options.folders, max(1, options.jobs)))
+    # slices left over from an earlier run must not end up in the master scene
+    for command, scene, log_path in jobs:
+        if os.path.exists(scene):
+            os.remove(scene)
+    exit_codes = runJobs(jobs, max(1, options.jobs))
+    for (command, scene, log_path), exit_code in zip(jobs, exit_codes):
+        print("{0}: {1} (log: {2})".format(scene, "ok" if exit_code == 0 else "failed with exit code {0}".format(exit_code), log_path))
+
+    # a slice whose worker failed for some folders still saved the others
+    scenes = [scene for command, scene, log_path in jobs if os.path.exists(scene)]
+    if options.master and scenes:
+        log_path = os.path.join(options.output, options.master + ".log")
+        command = workerCommand(options) + ["reference"] + scenes + ["-o", options.output, "--combine", options.master, "--format", options.format]
+        exit_codes.append(runCommand((command, None, log_path)))
+        print("{0}: {1}".format(os.path.join(options.output, options.master + "." + options.format), "ok" if exit_codes[-1] == 0 else "failed"))
+
+    return 0 if all(exit_code == 0 for exit_code in exit_codes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
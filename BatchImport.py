@@ -0,0 +1,150 @@
+# Command line entry point to build materials without the Maya GUI, for example on farm nodes:
+#
+#   mayapy BatchImport.py substance D:/libraries/wood D:/libraries/metal -o D:/shaders
+#   mayapy BatchImport.py axf D:/axf/fabrics -o D:/shaders --scene D:/ShaderBall/ShaderBall.ma --render-setup
+#   mayapy BatchImport.py reference D:/shaders/wood.ma D:/shaders/metal.ma -o D:/shaders --combine library
+#
+# Every folder is built in its own scene and saved as <output>/<folder name>.ma (or .mb), unless
+# --combine is given, then everything ends up in <output>/<combine>.ma. The reference tool creates a
+# scene that references the given scene files, BatchDriver.py uses it to assemble a master scene.
+
+import argparse
+import os
+import sys
+import traceback
+
+import Instrument
+
+tools = ["substance", "axf", "reference"]
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Build Redshift materials from substance exports or V-Ray AxF materials in mayapy.")
+    parser.add_argument("tool", choices=tools, help="importer to run on the folders")
+    parser.add_argument("folders", nargs="+", help="folders with texture maps or AxF files, or scene files to reference")
+    parser.add_argument("-o", "--output", required=True, help="folder to write the scenes to")
+    parser.add_argument("--format", choices=["ma", "mb"], default="ma", help="scene file format (default: ma)")
+    parser.add_argument("--combine", metavar="NAME", help="build all folders into one scene called NAME")
+    parser.add_argument("--scene", help="scene to open before building each folder, e.g. the ShaderBall scene")
+    parser.add_argument("--recursive", action="store_true", help="substance: also import textures from subfolders")
+    parser.add_argument("--render-setup", action="store_true", help="axf: create a render layer per material")
+    parser.add_argument("--renderer", default="redshift", help="substance: shader rules to build the materials with (default: redshift)")
+    parser.add_argument("--convert", action="store_true", help="substance: convert the textures to the renderer's tiled format first")
+    parser.add_argument("--resolution", metavar="TIER", help="substance: resolution variant of the maps to use, e.g. 8k on the farm")
+    parser.add_argument("--thumbnails", action="store_true", help="substance: also write thumbnails and contact sheets to "
+                        "<output>/thumbnails/<folder name>_<hash>, with --recursive for every subfolder too")
+    return parser.parse_args(argv)
+
+
+def outputPath(folder, options, used_names):
+    # <output>/<folder name>.<format>, numbered when two folders have the same name
+    name = os.path.basename(os.path.normpath(folder))
+    unique_name, number = name, 1
+    while unique_name in used_names:
+        unique_name = "{0}_{1}".format(name, number)
+        number += 1
+    used_names.add(unique_name)
+    return os.path.join(options.output, unique_name + "." + options.format)
+
+
+def openScene(options):
+    import pymel.core as pm
+    if options.scene:
+        pm.openFile(options.scene, force=True)
+    else:
+        pm.newFile(force=True)
+
+
+def buildFolder(folder, options):
+    # Builds the materials for one folder in the current (standalone) Maya session, returns the AxF materials
+    import pymel.core as pm
+    if options.tool == "substance":
+        import ImportSubstanceTextures
+        ImportSubstanceTextures.SetupMaterials(folder, recursive=options.recursive, resolution=options.resolution,
+                                               renderer=options.renderer, convert=options.convert)
+        if options.thumbnails:
+            import Thumbnails
+            with Instrument.stage("thumbnails"):
+                output = os.path.join(options.output, "thumbnails", Thumbnails.libraryFolderName(folder))
+                try:
+                    Thumbnails.makeLibraryThumbnails(folder, output, recursive=options.recursive)
+                except (IOError, OSError) as error:
+                    # the materials are built, missing thumbnails don't fail the folder
+                    sys.stderr.write("No thumbnails for {0}: {1}\n".format(folder, error))
+    elif options.tool == "axf":
+        import Import_AxF
+        Import_AxF.loadVray()
+        return Import_AxF.makeMaterials(folder)
+    else:
+        pm.createReference(folder, namespace=os.path.splitext(os.path.basename(folder))[0])
+    return []
+
+
+def buildScene(folders, output, options):
+    # Builds folders into one scene and saves it to output, returns the folders that failed
+    openScene(options)
+    failed = []
+    materials = []
+    for folder in folders:
+        if not os.path.exists(folder):
+            sys.stderr.write("Path is invalid: {0}\n".format(folder))
+            failed.append(folder)
+            continue
+        try:
+            materials.extend(buildFolder(folder, options))
+        except Exception:
+            # keep going, one broken library shouldn't stop the whole batch
+            traceback.print_exc()
+            failed.append(folder)
+    if len(failed) == len(folders):
+        return failed
+
+    try:
+        # doRenderSetup replaces all render layers, so it runs once for everything in the scene
+        if options.render_setup and materials:
+            import Import_AxF
+            Import_AxF.doRenderSetup(materials)
+            Import_AxF.setRenderSettings()
+        with Instrument.stage("save scene", commands=1):
+            saveScene(output, options.format)
+        print("{0} -> {1}".format(", ".join(folders), output))
+    except Exception:
+        traceback.print_exc()
+        return folders
+    return failed
+
+
+def saveScene(path, file_format):
+    import pymel.core as pm
+    pm.saveAs(path, force=True, type="mayaAscii" if file_format == "ma" else "mayaBinary")
+
+
+def main(argv=None):
+    options = parseArguments(argv)
+    if not os.path.isdir(options.output):
+        os.makedirs(options.output)
+
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    failed = []
+    used_names = set()
+    try:
+        with Instrument.run("BatchImport"):
+            if options.combine:
+                output = os.path.join(options.output, options.combine + "." + options.format)
+                failed = buildScene(options.folders, output, options)
+            else:
+                for folder in options.folders:
+                    failed.extend(buildScene([folder], outputPath(folder, options, used_names), options))
+    finally:
+        maya.standalone.uninitialize()
+
+    if failed:
+        sys.stderr.write("{0} of {1} folders failed:\n  {2}\n".format(len(failed), len(options.folders), "\n  ".join(failed)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,5 @@
 #Dialog to load textures exported from substance and create a rs_Material with these textures connected.
 
-import pymel.core as pm
 import os
 import collections
 import PySide2.QtWidgets as QtWidgets
@@ -9,135 +8,114 @@ import PySide2.QtCore as QtCore
 import shiboken2
 import maya.OpenMayaUI as omui
 import maya.OpenMaya as om
+from ScenePlan import applyPlan, writeManifest, validNodeName
+from SubstancePlan import SceneSnapshot, iterTextureIndexes, planMaterials
+from TextureScan import indexTextures
+from ScanCache import getScanCache
+from ShaderRules import getRules, rendererNames
+from TextureConvert import convertIndex
+import Instrument
+from LazyModule import lazyImport
+
+pm = lazyImport("pymel.core")
 
 
 def getMainWindow():
     main_window_ptr = omui.MQtUtil.mainWindow()
     return shiboken2.wrapInstance(long(main_window_ptr), QtWidgets.QWidget)
 
-def loadRedShift():
-    pm.loadPlugin("redshift4maya", quiet=True)
-
-
-map_types = ["anisotropyangle", "anisotropylevel", "basecolor", "clearcoatlevel", "clearcoatnormal", "height", "metallic", "normal", "roughness", "specularlevel"]
-slots = ["refl_aniso_rotation", "refl_aniso", "diffuse_color", "coat_weight", "coat_bump_input", "bump_input","refl_metalness", "bump_input", "refl_roughness","refl_reflectivity"]
-
-def SetupMaterials(my_path):
-    loadRedShift()
-    texture_dicts = getTextureDicts(my_path)
-    material_names = getMaterialNames(texture_dicts)
-
-    for i, mat in enumerate(material_names):
-        material = createMaterial(mat)
-        textures_per_material = [tex for tex in texture_dicts if tex["material"] == material_names[i]]
-        for tex in textures_per_material:
-            file_texture = createFileTexture(tex)
-            connectTexture(material, file_texture)
-
-def setTextureProperties(folder, filename):
-    texture = {
-    "name" : filename[:-4],
-    "path" : os.path.join(folder, filename),
-    "material" : filename[:-4][:filename.rfind("_")],
-    "map_type" : filename[:-4][filename[:-4].rfind("_")+1:]
-    }
-    return texture
-
-def getTextureDicts(search_path):
-    file_texture_names = []
-    for filename in os.listdir(search_path):
-        name, extension = os.path.splitext(filename)
-        if extension == ".exr".lower() or extension == ".jpg".lower() or extension == ".png".lower():
-            new_texture = setTextureProperties(search_path,filename)
-            if new_texture["map_type"] in map_types:
-                file_texture_names.append(new_texture)
-    return file_texture_names
-
-def getMaterialNames(texture_list):
-    materials = []
-    for t in texture_list:
-        materials.append(t["material"])
-    return list(collections.Counter(materials))
-
-def createMaterial(material_name):
-    material = pm.shadingNode("RedshiftMaterial", asShader=True, name="rs_"+material_name)
-    pm.setAttr(material.refl_fresnel_mode, 2)
-    pm.setAttr(material.refl_brdf, 1)
-    return material
-
-def createFileTexture(texture):
-    file_texture_node = pm.shadingNode('file', asTexture=True, isColorManaged=True, name=texture["map_type"])
-    pm.setAttr(file_texture_node.fileTextureName, texture["path"])
-    if texture["map_type"]=="basecolor" or texture["map_type"]=="specularlevel":
-        pm.setAttr(file_texture_node.colorSpace, "sRGB")
-    else:
-        pm.setAttr(file_texture_node.colorSpace, "Raw")
-    p2d = pm.shadingNode('place2dTexture', name=texture["map_type"] + "_p2d", asUtility=True)
-    pm.connectAttr(p2d.outUV, file_texture_node.uvCoord)
-    pm.connectAttr(p2d.outUvFilterSize, file_texture_node.uvFilterSize)
-    pm.connectAttr(p2d.vertexCameraOne, file_texture_node.vertexCameraOne)
-    pm.connectAttr(p2d.vertexUvOne, file_texture_node.vertexUvOne)
-    pm.connectAttr(p2d.vertexUvThree, file_texture_node.vertexUvThree)
-    pm.connectAttr(p2d.vertexUvTwo, file_texture_node.vertexUvTwo)
-    pm.connectAttr(p2d.coverage, file_texture_node.coverage)
-    pm.connectAttr(p2d.mirrorU, file_texture_node.mirrorU)
-    pm.connectAttr(p2d.mirrorV, file_texture_node.mirrorV)
-    pm.connectAttr(p2d.noiseUV, file_texture_node.noiseUV)
-    pm.connectAttr(p2d.offset, file_texture_node.offset)
-    pm.connectAttr(p2d.repeatUV, file_texture_node.repeatUV)
-    pm.connectAttr(p2d.rotateFrame, file_texture_node.rotateFrame)
-    pm.connectAttr(p2d.rotateUV, file_texture_node.rotateUV)
-    pm.connectAttr(p2d.stagger, file_texture_node.stagger)
-    pm.connectAttr(p2d.translateFrame, file_texture_node.translateFrame)
-    pm.connectAttr(p2d.wrapU, file_texture_node.wrapU)
-    pm.connectAttr(p2d.wrapV, file_texture_node.wrapV)
-    texture["node"]=file_texture_node
-    return texture
-
-def connectTexture(material,texture):
-    index = map_types.index(texture["map_type"])
-    input_slot = (material + "." + slots[index])
-
-    if index <2 or index ==3 or index ==6 or index==8:
-        output= (texture["node"]+".outAlpha")
-    else:
-        output = (texture["node"] + ".outColor")
-
-    # if bump- or normal-maps:
-    if index ==4 or index ==5 or index == 7:
-        # insert blender before bumpnode
-        if not pm.listConnections(input_slot):
-            bb = pm.shadingNode("RedshiftBumpBlender", asUtility=True, name=material._name+"_bb")
-            pm.connectAttr(bb.outColor, input_slot)
-            pm.setAttr(bb.additive, 1)
-        else:
-            bb = pm.listConnections(input_slot)[0]
-
-        bm = pm.shadingNode("RedshiftBumpMap", asUtility=True, name=material._name + "_bm")
 
-        # connect bumpnode to blender
-        if not pm.listConnections(bb, s=True, d=False):
-            pm.connectAttr(bm.out, bb.baseInput)
-        else:
-            connection_number = len(pm.listConnections(bb, s=True, d=False))-1
-            pm.connectAttr(bm.out, (bb +".bumpInput"+str(connection_number)))
-            pm.setAttr((bb + ".bumpWeight" + str(connection_number)), 1)
-
-        # set bump type
-        if index == 5:
-            # set inputType to Height
-            pm.setAttr(bm.inputType, 0)
-        else:
-            # set inputType to TangentSpace Normals
-            pm.setAttr(bm.inputType, 1)
-        input_slot = bm.input
+# the slots every map type is connected to are in shaderRules.json, see ShaderRules.py
+map_types = getRules().map_types
+# choices for the resolution variant of the maps, the first one is "no preference"
+resolutions = ["any resolution", "1k", "2k", "4k", "8k"]
+
+def SetupMaterials(my_path, recursive=False, use_cache=True, incremental=False, resolution=None, renderer="redshift", convert=False, **crawl_options):
+    # crawl_options (max_depth, include, exclude, workers) are passed on to crawlTextureIndexes.
+    # incremental only adds the maps that are not in the scene yet and repoints changed textures.
+    # resolution ("1k", "8k", ...) picks between resolution variants of the maps, e.g. low-res for
+    # interactive work, an incremental import then repoints the file nodes to the other tier.
+    # renderer selects the shader rules, see ShaderRules.py.
+    # convert points the file nodes at textures converted to the renderer's format, see TextureConvert.py.
+    with Instrument.run("ImportSubstanceTextures"):
+        pm.loadPlugin(getRules(renderer).plugin, quiet=True)
+        plans = iterSetupPlans(my_path, recursive, use_cache, incremental, resolution, renderer, convert, **crawl_options)
+        if not recursive:
+            return applyPlan(next(plans))
+
+        created = {}
+        pm.undoInfo(openChunk=True, chunkName="SetupMaterials")
+        try:
+            # the materials of a folder are built as soon as the crawler has listed it
+            for plan in plans:
+                created.update(applyPlan(plan))
+        finally:
+            pm.undoInfo(closeChunk=True)
+        return created
+
+def iterSetupPlans(my_path, recursive=False, use_cache=True, incremental=False, resolution=None, renderer="redshift", convert=False,
+                   run_converter=True, **crawl_options):
+    # The plan of every folder SetupMaterials imports, see there for the options. An incremental plan
+    # is compared with the scene when it's asked for, so apply each plan before asking for the next.
+    # With run_converter=False convert only uses textures that were converted before, the others keep
+    # their source file, so planning never starts the converters.
+    rules = getRules(renderer)
+    if convert and not rules.converter:
+        raise ValueError("the shader rules of {0} have no texture converter".format(renderer))
+    for texture_index in iterTextureIndexes(my_path, rules, recursive, use_cache, resolution, **crawl_options):
+        if convert:
+            with Instrument.stage("convert"):
+                convertIndex(texture_index, rules.converter, run=run_converter)
+        scene = snapshotScene(texture_index, rules) if incremental else None
+        with Instrument.stage("plan"):
+            plan = planMaterials(texture_index, scene=scene, rules=rules)
+        yield plan
+
+def getTextureDicts(search_path, use_cache=True, renderer="redshift"):
+    texture_index = indexTextures(search_path, getRules(renderer).names, cache=getScanCache() if use_cache else None)
+    return [tex for textures in texture_index.values() for tex in textures.values()]
 
-    pm.connectAttr(output, input_slot)
+def getMaterialNames(texture_list):
+    return list(collections.OrderedDict.fromkeys(tex.material for tex in texture_list))
+
+@Instrument.timed("snapshot")
+def snapshotScene(texture_index, rules=None):
+    # Queries the nodes created for the materials in texture_index by an earlier import, matched by
+    # the names the plan gave them (see ScenePlan.validNodeName).
+    rules = rules or getRules()
+    material_names = dict((validNodeName(rules.material_prefix + material_name), material_name) for material_name in texture_index)
+    scene = SceneSnapshot()
+    material_nodes = pm.ls(list(material_names), type=rules.material_type)
+    scene.materials = set(node.nodeName() for node in material_nodes)
+    texture_names = [validNodeName(tex.name) for textures in texture_index.values() for tex in textures.values()]
+    for node in pm.ls(texture_names, type="file"):
+        signature = node.textureSignature.get() if node.hasAttr("textureSignature") else None
+        scene.file_nodes[node.nodeName()] = (node.fileTextureName.get(), signature)
+
+    blender_type = rules.bump_blender["type"] if rules.bump_blender else None
+    for node in material_nodes:
+        material = node.nodeName()
+        textures = texture_index[material_names[material]]
+        if all(validNodeName(tex.name) in scene.file_nodes for tex in textures.values()):
+            continue
+        # new maps for this material are hooked up to its existing place2dTexture and bump blenders
+        p2ds = pm.ls(material + "_p2d", type="place2dTexture")
+        if p2ds:
+            scene.p2ds[material] = p2ds[0].nodeName()
+        scene.slot_inputs[material] = {}
+        for slot in rules.shared_slots:
+            blended = blender_type is not None and slot in rules.bump_slots
+            flags = {"type": blender_type} if blended else {}
+            inputs = pm.listConnections(node.attr(slot), s=True, d=False, **flags)
+            if inputs:
+                input_count = len(pm.listConnections(inputs[0], s=True, d=False)) if blended else 1
+                scene.slot_inputs[material][slot] = [inputs[0].nodeName(), input_count]
+    return scene
 
 
 class SubstanceTextureImporter(QtWidgets.QDialog):
-    def __init__(self, parent=getMainWindow()):
-        super(SubstanceTextureImporter, self).__init__(parent)
+    def __init__(self, parent=None):
+        super(SubstanceTextureImporter, self).__init__(parent or getMainWindow())
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowContextHelpButtonHint)
         self.setMinimumSize(400, 80)
         self.setWindowTitle("Substance Texture Importer")
@@ -150,6 +128,20 @@ class SubstanceTextureImporter(QtWidgets.QDialog):
         self.path_btn.setIcon(QtGui.QIcon(":fileOpen.png"))
         self.path_btn.setToolTip("select folder with texture maps")
 
+        self.recursive_cbx = QtWidgets.QCheckBox("include subfolders")
+        self.incremental_cbx = QtWidgets.QCheckBox("update existing")
+        self.incremental_cbx.setToolTip("only add new maps and repoint changed textures of materials that are already in the scene")
+        self.resolution_cmb = QtWidgets.QComboBox()
+        self.resolution_cmb.addItems(resolutions)
+        self.resolution_cmb.setToolTip("resolution variant of the maps (<map>_2k.exr) to use, lower tiers load faster in IPR")
+        self.renderer_cmb = QtWidgets.QComboBox()
+        self.renderer_cmb.addItems(rendererNames())
+        self.renderer_cmb.setToolTip("shader rules to build the materials with, see shaderRules.json")
+        self.convert_cbx = QtWidgets.QCheckBox("convert textures")
+        self.convert_cbx.setToolTip("use textures converted to the tiled, mipmapped format of the renderer (converted once, then cached)")
+
+        self.export_btn = QtWidgets.QPushButton("Export Plan...")
+        self.export_btn.setToolTip("write the nodes and connections the import would create to a manifest instead, see ApplyManifest.py")
         self.ok_btn = QtWidgets.QPushButton("Apply")
         self.cancel_btn = QtWidgets.QPushButton("Cancel")
 
@@ -162,6 +154,13 @@ class SubstanceTextureImporter(QtWidgets.QDialog):
         self.input_layout.addWidget(self.inputfield_lne)
         self.input_layout.addWidget(self.path_btn)
 
+        self.action_layout.addWidget(self.recursive_cbx)
+        self.action_layout.addWidget(self.incremental_cbx)
+        self.action_layout.addWidget(self.resolution_cmb)
+        self.action_layout.addWidget(self.renderer_cmb)
+        self.action_layout.addWidget(self.convert_cbx)
+        self.action_layout.addStretch()
+        self.action_layout.addWidget(self.export_btn)
         self.action_layout.addWidget(self.ok_btn)
         self.action_layout.addWidget(self.cancel_btn)
 
@@ -170,6 +169,7 @@ class SubstanceTextureImporter(QtWidgets.QDialog):
         self.main_layout.addLayout(self.action_layout)
 
         self.path_btn.clicked.connect(self.openDialog)
+        self.export_btn.clicked.connect(self.exportPlan)
         self.ok_btn.clicked.connect(self.apply)
         self.cancel_btn.clicked.connect(self.cancel)
 
@@ -186,18 +186,36 @@ class SubstanceTextureImporter(QtWidgets.QDialog):
         else:
             om.MGlobal.displayError("Path is invalid")
 
+    def exportPlan(self):
+        search_path = self.inputfield_lne.text()
+        if not os.path.exists(search_path):
+            om.MGlobal.displayError("Path is invalid")
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Plan", "", "Manifests (*.json *.msgpack)", options=QtWidgets.QFileDialog.DontUseNativeDialog)
+        if path:
+            options = self.setupOptions()
+            with Instrument.run("ImportSubstanceTextures"):
+                if options["incremental"]:
+                    # the scene snapshot looks for the renderer's material type
+                    pm.loadPlugin(getRules(options["renderer"]).plugin, quiet=True)
+                # exporting doesn't start the converters, maps that weren't converted yet keep their source file
+                plans = list(iterSetupPlans(search_path, run_converter=False, **options))
+            writeManifest(path, plans, tool="substance", options=dict(options, folder=search_path))
+
     def cancel(self):
         self.close()
 
+    def setupOptions(self):
+        resolution = self.resolution_cmb.currentText()
+        return {"recursive": self.recursive_cbx.isChecked(), "incremental": self.incremental_cbx.isChecked(),
+                "resolution": None if resolution == resolutions[0] else resolution,
+                "renderer": self.renderer_cmb.currentText(), "convert": self.convert_cbx.isChecked()}
+
     def import_textures(self, search_path):
-        print "importing"
-        SetupMaterials(search_path)
+        print("importing")
+        SetupMaterials(search_path, **self.setupOptions())
 
 
 if __name__== "__main__":
-    for entry in QtWidgets.QApplication.allWidgets():
-        if entry.objectName() == "subs_texture_dialog":
-            entry.close()
-
-    tex_dialog = SubstanceTextureImporter()
-    tex_dialog.show()
+    import Launcher
+    tex_dialog = Launcher.show("substance")
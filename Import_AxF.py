@@ -1,18 +1,23 @@
 # TODO:
 #   - import shaderball scene
-#   - exclude files starting with "."
 
 # Dialog to load AxF files into newly created V-Ray AxF_Materials
-import maya.app.renderSetup.model.renderLayer as renderLayer
-import maya.app.renderSetup.model.renderSetup as renderSetup
 import PySide2.QtWidgets as QtWidgets
 import PySide2.QtGui as QtGui
 import PySide2.QtCore as QtCore
 import shiboken2
 import maya.OpenMayaUI as omui
 import maya.OpenMaya as om
-import pymel.core as pm
 import os
+from ScenePlan import ScenePlan, applyPlan, writeManifest
+from AxFPlan import render_layer_members, filterAxF, planMaterials, planRenderLayers, planRenderSettings
+import Instrument
+from LazyModule import lazyImport
+
+# pymel and renderSetup are only imported once they are used, after the dialog is up
+pm = lazyImport("pymel.core")
+renderLayer = lazyImport("maya.app.renderSetup.model.renderLayer")
+renderSetup = lazyImport("maya.app.renderSetup.model.renderSetup")
 
 def getMainWindow():
     main_window_ptr = omui.MQtUtil.mainWindow()
@@ -21,10 +26,81 @@ def getMainWindow():
 def loadVray():
     pm.loadPlugin("vrayformaya", quiet=True)
 
+def makeMaterials(search_path, use_cache=True):
+    # the plan loads V-Ray, see AxFPlan.planMaterials
+    plan = planMaterials(search_path, use_cache)
+    created = applyPlan(plan)
+    materials = [created[key] for key, node_type, name, flags in plan.nodes]
+    print("{0} AxF materials created".format(len(materials)))
+    return materials
+
+@Instrument.timed("render setup")
+def doRenderSetup(materials, bulk=True, progress=None):
+    # Replaces all render layers with one layer per material. By default the layers are planned and
+    # decoded as one renderSetup document (see ScenePlan.applyRenderLayers), instead of building them
+    # call by call, which makes renderSetup update after every change. progress(step, total) is called
+    # before each step and can return False to cancel, doRenderSetup then returns False.
+    # The per layer setup steps through the layers and can be cancelled between any two of them. The
+    # bulk setup steps through planning, the decode and connecting the overrides, and can only be
+    # cancelled before the decode, which is one renderSetup call. A cancelled bulk setup leaves the
+    # scene untouched.
+    if not bulk:
+        return doRenderSetupPerLayer(materials, progress)
+
+    steps = ["plan", "decode", "connect overrides"]
+    if progress and progress(0, len(steps)) is False:
+        return False
+    plan = planRenderLayers(ScenePlan(), [str(material) for material in materials])
+    if progress and progress(steps.index("decode"), len(steps)) is False:
+        return False
+
+    def reportStage(stage):
+        # the decode was reported above, as the last chance to cancel
+        if progress and stage == "connect overrides":
+            progress(steps.index(stage), len(steps))
+
+    applyPlan(plan, progress=reportStage)
+    if progress:
+        progress(len(steps), len(steps))
+    return True
+
+def doRenderSetupPerLayer(materials, progress=None):
+    # Delete all renderlayers
+    render_setup = renderSetup.instance()
+    all_render_layers = render_setup.getRenderLayers()
+    for i in all_render_layers:
+        renderLayer.delete(i)
+
+    for i,material in enumerate(materials):
+        if progress and progress(i, len(materials)) is False:
+            return False
+        # Create and append the render layer
+        rl = render_setup.createRenderLayer("Maya_" + str(material))
+
+        # Create and append collections
+        my_collection = rl.createCollection("AxF_{0}_collection".format(i))
+
+        # add the object we're overriding to the collection
+        my_selector = my_collection.getSelector()
+        my_selector.setFilterType(0)
+        my_selector.staticSelection.add(render_layer_members)
+
+        # create a connection override
+        my_override = my_collection.createConnectionOverride("SB_Blend", "base_material")
+        # give it a name so we can connect to it
+        my_override.setName("SB_Blend_{0}_override".format(i))
+        # make the connection, note the name of the slot is attrValue
+        pm.connectAttr(str(material)+".outColor", "SB_Blend_{0}_override.attrValue".format(i), f=True)
+    return True
+
+def setRenderSettings():
+    # string values like fileNamePrefix are set with type="string" by pymel
+    applyPlan(planRenderSettings(ScenePlan()))
+
 
 class AxFImporter(QtWidgets.QDialog):
-    def __init__(self, parent=getMainWindow()):
-        super(AxFImporter, self).__init__(parent)
+    def __init__(self, parent=None):
+        super(AxFImporter, self).__init__(parent or getMainWindow())
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowContextHelpButtonHint)
         self.setMinimumSize(400, 80)
         self.setWindowTitle("AxFImporter")
@@ -37,6 +113,8 @@ class AxFImporter(QtWidgets.QDialog):
         self.path_btn.setIcon(QtGui.QIcon(":fileOpen.png"))
         self.path_btn.setToolTip("select folder with AxFfiles")
 
+        self.export_btn = QtWidgets.QPushButton("Export Plan...")
+        self.export_btn.setToolTip("write the materials, render layers and render settings the import would create to a manifest instead, see ApplyManifest.py")
         self.ok_btn = QtWidgets.QPushButton("Apply")
         self.cancel_btn = QtWidgets.QPushButton("Cancel")
 
@@ -49,6 +127,7 @@ class AxFImporter(QtWidgets.QDialog):
         self.input_layout.addWidget(self.inputfield_lne)
         self.input_layout.addWidget(self.path_btn)
 
+        self.action_layout.addWidget(self.export_btn)
         self.action_layout.addWidget(self.ok_btn)
         self.action_layout.addWidget(self.cancel_btn)
 
@@ -57,6 +136,7 @@ class AxFImporter(QtWidgets.QDialog):
         self.main_layout.addLayout(self.action_layout)
 
         self.path_btn.clicked.connect(self.openDialog)
+        self.export_btn.clicked.connect(self.exportPlan)
         self.ok_btn.clicked.connect(self.apply)
         self.cancel_btn.clicked.connect(self.cancel)
 
@@ -68,82 +148,56 @@ class AxFImporter(QtWidgets.QDialog):
 
     def apply(self):
         if os.path.exists(self.inputfield_lne.text()):
-            materials = self.makeMaterials(self.inputfield_lne.text())
-            self.doRenderSetup(materials)
-            self.setRenderSettings()
+            with Instrument.run("Import_AxF"):
+                materials = self.makeMaterials(self.inputfield_lne.text())
+                if self.doRenderSetup(materials):
+                    self.setRenderSettings()
             self.close()
         else:
             om.MGlobal.displayError("Path is invalid")
 
+    def exportPlan(self):
+        search_path = self.inputfield_lne.text()
+        if not os.path.exists(search_path):
+            om.MGlobal.displayError("Path is invalid")
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Plan", "", "Manifests (*.json *.msgpack)", options=QtWidgets.QFileDialog.DontUseNativeDialog)
+        if path:
+            with Instrument.run("Import_AxF"):
+                plan = planMaterials(search_path)
+                # the layers are named after the material nodes, like doRenderSetup does after makeMaterials
+                materials = [name for key, node_type, name, flags in plan.nodes]
+                plans = [plan, planRenderSettings(planRenderLayers(ScenePlan(), materials))]
+            writeManifest(path, plans, tool="axf", options={"folder": search_path, "render_setup": True})
+
     def cancel(self):
         self.close()
 
     def makeMaterials(self, search_path):
-        materials=[]
-        axfs = self.filterAxF(search_path)
-        for axf_file in axfs:
-            full_path = os.path.join(search_path, axf_file)
-            shader_name = "AxF_" + axf_file[:-4]
-            # Make material nodes
-            material = pm.shadingNode("AxfMaterial", asShader=True, name=shader_name)
-            materials.append(material)
-            # Point material to AxF file
-            pm.setAttr(str(material.AxFFilename), full_path)
-        print("{0} AxF materials created".format(len(axfs)))
-        return materials
-
-
-    def doRenderSetup(self,materials):
-        # Delete all renderlayers
-        render_setup = renderSetup.instance()
-        all_render_layers = render_setup.getRenderLayers()
-        for i in all_render_layers:
-            renderLayer.delete(i)
-
-        for i,material in enumerate(materials):
-            # Create and append the render layer
-            rl = render_setup.createRenderLayer("Maya_" + material._name)
-
-            # Create and append collections
-            my_collection = rl.createCollection("AxF_{0}_collection".format(i))
-
-            # add the object we're overriding to the collection
-            my_selector = my_collection.getSelector()
-            my_selector.setFilterType(0)
-            my_selector.staticSelection.add(["SB_Blend", "CAMERA", "LIGHTS", "GEO"])
-
-            # create a connection override
-            my_override = my_collection.createConnectionOverride("SB_Blend", "base_material")
-            # give it a name so we can connect to it
-            my_override.setName("SB_Blend_{0}_override".format(i))
-            # make the connection, note the name of the slot is attrValue
-            pm.connectAttr(material._name+".outColor", "SB_Blend_{0}_override.attrValue".format(i), f=True)
-
-
-    def filterAxF(self, searchPath):
-        all_files = os.listdir(searchPath)
-        axfs = []
-        for file in all_files:
-            extension = os.path.splitext(file)[-1][1:]
-            if extension.lower() == "axf":
-                axfs.append(file)
-        return axfs
+        return makeMaterials(search_path)
+
+    def doRenderSetup(self, materials):
+        progress_dialog = QtWidgets.QProgressDialog("Creating render layers...", "Cancel", 0, len(materials), self)
+        progress_dialog.setWindowModality(QtCore.Qt.WindowModal)
+
+        def progress(step, total):
+            # the bulk setup reports its steps instead of the layers
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(step)
+            return not progress_dialog.wasCanceled()
+
+        try:
+            return doRenderSetup(materials, progress=progress)
+        finally:
+            progress_dialog.close()
+
+    def filterAxF(self, searchPath, use_cache=True):
+        return filterAxF(searchPath, use_cache)
 
     def setRenderSettings(self):
-        pm.setAttr("perspShape.renderable", 0)
-        pm.setAttr("vraySettings.giOn", 1)
-        pm.setAttr("vraySettings.imageFormatStr", "png")
-        pm.setAttr("vraySettings.fileNamePrefix", "<Camera>/<Scene>/<Layer>", type="string")
-        pm.setAttr("vraySettings.width", 1280)
-        pm.setAttr("vraySettings.height", 1024)
-        pm.setAttr("defaultRenderGlobals.endFrame", 0)
-        pm.setAttr("defaultRenderGlobals.startFrame", 0)
+        setRenderSettings()
 
 if __name__== "__main__":
-    for entry in QtWidgets.QApplication.allWidgets():
-        if entry.objectName() == "AxF_dialog":
-            entry.close()
-    loadVray()
-    AxF_dialog = AxFImporter()
-    AxF_dialog.show()
-    print AxF_dialog.objectName()
\ No newline at end of file
+    import Launcher
+    AxF_dialog = Launcher.show("axf")
+    print(AxF_dialog.objectName())
\ No newline at end of file
@@ -1,24 +1,50 @@
 # Dialog to create rs_BlendMaterials based on the names entered.
 
 import PySide2.QtWidgets as QtWidgets
-import PySide2.QtGui as QtGui
 import PySide2.QtCore as QtCore
 import shiboken2
 import maya.OpenMayaUI as omui
-import pymel.core as pm
-import string
-import os
+import maya.cmds as cmds
+import Instrument
+from ScenePlan import applyPlan, writeManifest
+from MUSPlan import iter_part_names, plan_blend_materials
+from LazyModule import lazyImport
+
+pm = lazyImport("pymel.core")
 
 def get_main_window():
     main_window_ptr = omui.MQtUtil.mainWindow()
     return shiboken2.wrapInstance(long(main_window_ptr), QtWidgets.QWidget)
 
-def load_redshift():
-    pm.loadPlugin("redshift4maya", quiet=True)
+def get_scene_names():
+    # short names of all nodes in the scene, from a single ls call
+    return set(name.rsplit("|", 1)[-1] for name in cmds.ls() or [])
+
+def get_geo_parts(group="GEO"):
+    # short name -> full path of the transforms below the GEO group, the shallowest one wins
+    if not cmds.objExists(group):
+        return {}
+    parts = {}
+    paths = cmds.listRelatives(group, allDescendents=True, type="transform", fullPath=True) or []
+    for path in sorted(paths, key=lambda path: path.count("|")):
+        parts.setdefault(path.rsplit("|", 1)[-1], path)
+    return parts
+
+def plan_scene_blend_materials(part_names, link_geo=False):
+    # The blend materials for the current scene, names are made unique against one snapshot of it
+    with Instrument.stage("snapshot", commands=2 if link_geo else 1):
+        taken_names = get_scene_names()
+        geo_parts = get_geo_parts() if link_geo else None
+    with Instrument.stage("plan"):
+        return plan_blend_materials(part_names, taken_names, geo_parts)
+
+def create_blend_materials(part_names, link_geo=False):
+    # Creates all blend materials in one undo chunk, the plan loads Redshift
+    return applyPlan(plan_scene_blend_materials(part_names, link_geo))
 
 class ImportMUS(QtWidgets.QDialog):
-    def __init__(self, parent=get_main_window()):
-        super(ImportMUS, self).__init__(parent)
+    def __init__(self, parent=None):
+        super(ImportMUS, self).__init__(parent or get_main_window())
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowContextHelpButtonHint)
         self.setMinimumSize(400, 80)
         self.setWindowTitle("MUS importer")
@@ -33,13 +59,21 @@ class ImportMUS(QtWidgets.QDialog):
         self.input_layout.addWidget(self.inputfield_lbl)
         self.input_layout.addWidget(self.inputfield_txe)
 
+        self.export_btn = QtWidgets.QPushButton("Export Plan...")
+        self.export_btn.setToolTip("write the materials the import would create to a manifest instead, see ApplyManifest.py")
         self.ok_btn = QtWidgets.QPushButton("Apply")
         self.cancel_btn = QtWidgets.QPushButton("Cancel")
+        self.link_cbx = QtWidgets.QCheckBox("assign to GEO parts")
+        self.link_cbx.setToolTip("create a shading group per material and assign the part with the same name in GEO to it")
+        self.export_btn.clicked.connect(self.export_plan)
         self.ok_btn.clicked.connect(self.apply)
         self.cancel_btn.clicked.connect(self.cancel)
 
         self.action_layout = QtWidgets.QHBoxLayout(self)
         self.action_layout.setAlignment(QtCore.Qt.AlignRight)
+        self.action_layout.addWidget(self.link_cbx)
+        self.action_layout.addStretch()
+        self.action_layout.addWidget(self.export_btn)
         self.action_layout.addWidget(self.ok_btn)
         self.action_layout.addWidget(self.cancel_btn)
 
@@ -47,44 +81,29 @@ class ImportMUS(QtWidgets.QDialog):
         self.main_layout.addLayout(self.action_layout)
 
     def apply(self):
-        part_names = self.cleanup_input(self.inputfield_txe.toPlainText())
-        for i, name in enumerate(part_names):
-            self.create_rs_blend_material(str(i+1).zfill(2) + "_" + name)
+        with Instrument.run("Import_MUS"):
+            with Instrument.stage("parse"):
+                part_names = self.cleanup_input(self.inputfield_txe.toPlainText())
+            create_blend_materials(part_names, link_geo=self.link_cbx.isChecked())
         self.close()
 
+    def export_plan(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Plan", "", "Manifests (*.json *.msgpack)", options=QtWidgets.QFileDialog.DontUseNativeDialog)
+        if path:
+            link_geo = self.link_cbx.isChecked()
+            with Instrument.run("Import_MUS"):
+                with Instrument.stage("parse"):
+                    part_names = self.cleanup_input(self.inputfield_txe.toPlainText())
+                plan = plan_scene_blend_materials(part_names, link_geo=link_geo)
+            writeManifest(path, [plan], tool="mus", options={"link_geo": link_geo})
+
     def cancel(self):
         self.close()
 
     def cleanup_input(self, text_input):
-        alpha_numeric = (string.ascii_letters + string.digits + "_-,")
-        comma_separated = text_input.replace(" ", "_").split(",")
-        clean_input = []
-        for t in comma_separated:
-            for line in [s for s in t.splitlines() if s]:
-                illegal_chars_removed = "".join([c for c in line if c in alpha_numeric])
-                if not illegal_chars_removed[0] in (string.digits + "_-"):
-                    if illegal_chars_removed !="":
-                        clean_input.append(illegal_chars_removed)
-                else:
-                    while illegal_chars_removed[0] in (string.digits + "_-"):
-                        illegal_chars_removed = illegal_chars_removed[1:]
-                        if len(illegal_chars_removed) == 0:
-                            break
-                    if illegal_chars_removed != "":
-                        clean_input.append(illegal_chars_removed)
-        if len(clean_input) > 0:
-            return clean_input
-
-
-
-    def create_rs_blend_material(self,material_name):
-        blend_material = pm.shadingNode("RedshiftMaterialBlender", asShader=True, name="rs_" + material_name)
+        return list(iter_part_names(text_input))
 
 
 if __name__ == "__main__":
-    for entry in QtWidgets.QApplication.allWidgets():
-        if entry.objectName() == "MUS_dialog":
-            entry.close()
-    load_redshift()
-    MUS_dialog = ImportMUS()
-    MUS_dialog.show()
+    import Launcher
+    MUS_dialog = Launcher.show("mus")
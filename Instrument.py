@@ -0,0 +1,150 @@
+# Per stage timing of the tools, to see where the time goes on big libraries.
+#
+#   with Instrument.run("ImportSubstanceTextures"):
+#       with Instrument.stage("scan"):
+#           ...
+#       with Instrument.stage("create nodes") as create_stage:
+#           create_stage.nodes += len(nodes)
+#
+# Every stage records how often it ran, its wall time, the number of Maya commands it issued and the
+# nodes it created. When the outermost run finishes, the report is written as json and csv to
+# $PRODUCT_REPLACEMENT_REPORTS (default ~/.productReplacement/reports, "off" disables writing).
+# Stages outside of a run are not recorded.
+
+import os
+import csv
+import json
+import time
+import functools
+import collections
+import contextlib
+
+default_report_folder = os.path.join(os.path.expanduser("~"), ".productReplacement", "reports")
+report_fields = ["stage", "runs", "seconds", "commands", "nodes"]
+
+_active_report = None
+
+
+class Stage(object):
+    __slots__ = ("name", "runs", "seconds", "commands", "nodes")
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.seconds = 0.0
+        self.commands = 0
+        self.nodes = 0
+
+    def toDict(self):
+        return dict((field, getattr(self, field if field != "stage" else "name")) for field in report_fields)
+
+
+class Report(object):
+    def __init__(self, tool):
+        self.tool = tool
+        self.started = time.time()
+        self.seconds = 0.0
+        self.stages = collections.OrderedDict()
+
+    def getStage(self, name):
+        if name not in self.stages:
+            self.stages[name] = Stage(name)
+        return self.stages[name]
+
+    def toDict(self):
+        return {"tool": self.tool,
+                "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "seconds": self.seconds,
+                "stages": [stage.toDict() for stage in self.stages.values()]}
+
+    def write(self, folder):
+        # writes <tool>_<date>_<time>_<process id>.json and .csv to folder and returns the json path
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        started = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.started))
+        base_name = os.path.join(folder, "{0}_{1}_{2}".format(self.tool, started, os.getpid()))
+        with open(base_name + ".json", "w") as json_file:
+            json.dump(self.toDict(), json_file, indent=4)
+        with open(base_name + ".csv", "w") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=report_fields, lineterminator="\n")
+            writer.writeheader()
+            for stage in self.stages.values():
+                writer.writerow(stage.toDict())
+        return base_name + ".json"
+
+
+class _NoStage(object):
+    # stand-in for stages outside of a run, so callers never have to check
+    __slots__ = ("commands", "nodes")
+
+    def __init__(self):
+        self.commands = 0
+        self.nodes = 0
+
+
+@contextlib.contextmanager
+def run(tool):
+    # Collects the stages of one run of a tool. Runs inside another run are added to the outer report.
+    global _active_report
+    if _active_report is not None:
+        yield _active_report
+        return
+
+    report = Report(tool)
+    _active_report = report
+    start = time.time()
+    try:
+        yield report
+    finally:
+        report.seconds = time.time() - start
+        _active_report = None
+        report_folder = os.environ.get("PRODUCT_REPLACEMENT_REPORTS", default_report_folder)
+        if report_folder != "off":
+            try:
+                report.write(report_folder)
+            except (IOError, OSError):
+                # a report must never break the tool itself
+                pass
+
+
+@contextlib.contextmanager
+def stage(name, commands=0, nodes=0):
+    if _active_report is None:
+        yield _NoStage()
+        return
+    current_stage = _active_report.getStage(name)
+    current_stage.runs += 1
+    current_stage.commands += commands
+    current_stage.nodes += nodes
+    start = time.time()
+    try:
+        yield current_stage
+    finally:
+        current_stage.seconds += time.time() - start
+
+
+def timed(name):
+    # decorator version of stage
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timedIterator(name, iterable):
+    # times the work of producing each item of iterable, not the work done with it
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def activeReport():
+    return _active_report
@@ -0,0 +1,53 @@
+# Entry point for shelf buttons, e.g. for the substance importer:
+#
+#   import Launcher
+#   Launcher.show("substance")
+#
+# A tool's module is only imported the first time its dialog is opened, and pymel and the render
+# plugins only once the tool actually does something (see LazyModule.py). Every tool has one dialog,
+# opening it again shows the existing one instead of building a new one. The time to the dialog is
+# recorded per stage (import, construct, show) in the Instrument reports of "Launcher_<tool>".
+
+import collections
+import importlib
+
+import Instrument
+
+# tool -> (module, dialog class)
+tools = collections.OrderedDict([
+    ("substance", ("ImportSubstanceTextures", "SubstanceTextureImporter")),
+    ("axf", ("Import_AxF", "AxFImporter")),
+    ("mus", ("Import_MUS", "ImportMUS")),
+    ("linker", ("MaterialLinker", "MaterialLinker")),
+])
+
+_dialogs = {}
+
+
+def isAlive(dialog):
+    # False once Qt deleted the dialog, e.g. when Maya's main window was rebuilt
+    import shiboken2
+    return shiboken2.isValid(dialog)
+
+
+def show(tool):
+    # Shows the dialog of tool and returns it
+    if tool not in tools:
+        raise KeyError("unknown tool '{0}', known are {1}".format(tool, ", ".join(tools)))
+    with Instrument.run("Launcher_" + tool):
+        dialog = _dialogs.get(tool)
+        if dialog is not None and isAlive(dialog):
+            if hasattr(dialog, "refresh"):
+                with Instrument.stage("refresh"):
+                    dialog.refresh()
+        else:
+            module_name, class_name = tools[tool]
+            with Instrument.stage("import"):
+                module = importlib.import_module(module_name)
+            with Instrument.stage("construct"):
+                dialog = _dialogs[tool] = getattr(module, class_name)()
+        with Instrument.stage("show"):
+            dialog.show()
+            dialog.raise_()
+            dialog.activateWindow()
+    return dialog
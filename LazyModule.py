@@ -0,0 +1,37 @@
+# Modules that are only imported when they are first used. pymel.core takes seconds to import on a
+# cold start, with pm = lazyImport("pymel.core") a tool's dialog can be shown before that happens.
+
+import importlib
+
+
+class LazyModule(object):
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def __getattr__(self, attribute):
+        value = getattr(self._load(), attribute)
+        # later lookups of the same attribute don't come through here anymore
+        object.__setattr__(self, attribute, value)
+        return value
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self):
+        return "<lazy module '{0}'{1}>".format(self._name, "" if self._module is None else " (loaded)")
+
+    # underscore names, so they can't hide an attribute of the module
+    def _load(self):
+        if self._module is None:
+            object.__setattr__(self, "_module", importlib.import_module(self._name))
+        return self._module
+
+
+def lazyImport(name):
+    return LazyModule(name)
+
+
+def isLoaded(module):
+    # False for a lazy module that wasn't used yet
+    return not isinstance(module, LazyModule) or module._module is not None
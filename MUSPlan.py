@@ -0,0 +1,49 @@
+# Maya-free half of Import_MUS: part names from a pasted list and an rs_BlendMaterial per part,
+# as a ScenePlan. PlanManifest.py uses it to write manifests without Maya.
+
+import re
+from ScenePlan import ScenePlan, validNodeName
+
+# a part name runs up to the next comma or line break
+part_tokens = re.compile(r"[^,\r\n\x0b\x0c\x1c\x1d\x1e\x85]+")
+illegal_chars = re.compile(r"[^A-Za-z0-9_\-]+")
+leading_chars = "0123456789_-"
+
+def iter_part_names(text_input):
+    # Yields the unique part names in a pasted list. Spaces become underscores, other characters
+    # that aren't allowed in node names are removed and names can't start with a digit, "_" or "-".
+    seen = set()
+    for match in part_tokens.finditer(text_input):
+        name = illegal_chars.sub("", match.group().replace(" ", "_")).lstrip(leading_chars)
+        if name and name not in seen:
+            seen.add(name)
+            yield name
+
+def reserve_name(name, taken_names):
+    # name, or name with the first free number appended like Maya does, and marks it as taken
+    unique_name, number = name, 1
+    while unique_name in taken_names:
+        unique_name = "{0}{1}".format(name, number)
+        number += 1
+    taken_names.add(unique_name)
+    return unique_name
+
+def plan_blend_materials(part_names, taken_names, geo_parts=None, plan=None):
+    # Plans an rs_<number>_<part> blend material per part, numbered with enough digits for the whole list.
+    # With geo_parts, every blend material also gets a shading group that the matching GEO part is assigned to.
+    # Names are reserved as Maya will store them (a part like M6-bolt becomes rs_01_M6_bolt), so they are
+    # checked against taken_names under the name the node really gets.
+    plan = plan or ScenePlan()
+    plan.requirePlugin("redshift4maya")
+    width = max(2, len(str(len(part_names))))
+    for i, name in enumerate(part_names):
+        material_name = validNodeName("rs_" + str(i+1).zfill(width) + "_" + name)
+        blend_material = plan.addNode(reserve_name(material_name, taken_names), "RedshiftMaterialBlender", asShader=True)
+        if geo_parts is None:
+            continue
+        shading_group = plan.addShadingGroup(reserve_name(material_name + "SG", taken_names))
+        plan.connectAttr(blend_material, "outColor", shading_group, "surfaceShader")
+        part = geo_parts.get(validNodeName(name))
+        if part and not plan.hasNode(part):
+            plan.addMembers(shading_group, [plan.addExisting(part)])
+    return plan
@@ -4,7 +4,12 @@ import PySide2.QtWidgets as QtWidgets
 import PySide2.QtCore as QtCore
 import shiboken2
 import maya.OpenMayaUI as omui
-import pymel.core as pm
+import maya.cmds as cmds
+import Instrument
+from ScenePlan import ScenePlan, applyPlan, writeManifest
+from LazyModule import lazyImport
+
+pm = lazyImport("pymel.core")
 
 
 def getMainWindow():
@@ -12,97 +17,185 @@ def getMainWindow():
     return shiboken2.wrapInstance(long(main_window_ptr), QtWidgets.QWidget)
 
 
-def loadVray():
-    pm.loadPlugin("vrayformaya", quiet=True)
+def getSceneMaterials():
+    # Sorted names of all blend materials and of all base materials, with a single scene query
+    blend_materials, base_materials = [], []
+    if not cmds.pluginInfo("redshift4maya", query=True, loaded=True):
+        # without Redshift there are no Redshift materials, no need to load it just to find that out
+        return blend_materials, base_materials
+    names_and_types = cmds.ls(type=["RedshiftMaterialBlender", "RedshiftMaterial"], showType=True) or []
+    for name, node_type in zip(names_and_types[::2], names_and_types[1::2]):
+        if node_type == "RedshiftMaterialBlender":
+            blend_materials.append(name)
+        else:
+            base_materials.append(name)
+    return sorted(blend_materials), sorted(base_materials)
+
+
+def getBaseMaterialLinks(blend_materials):
+    # Name of the material connected to the baseColor of every blend material, or None.
+    # All connections come from one listConnections call, which returns [plug, source, plug, source, ...]
+    if not blend_materials:
+        return []
+    plugs = [blend_material + ".baseColor" for blend_material in blend_materials]
+    connections = cmds.listConnections(plugs, s=True, d=False, connections=True) or []
+    sources = dict((plug.split(".", 1)[0], source) for plug, source in zip(connections[::2], connections[1::2]))
+    return [sources.get(blend_material) for blend_material in blend_materials]
+
+
+def planLinks(links, plan=None):
+    # connects the outColor of every (blend material, base material) pair's base material to the
+    # baseColor of the blend material, replacing the material that was linked before
+    plan = plan or ScenePlan()
+    for blend_material, base_material in links:
+        for material in (blend_material, base_material):
+            if not plan.hasNode(material):
+                plan.addExisting(material)
+        plan.connectAttr(base_material, "outColor", blend_material, "baseColor", force=True)
+    return plan
+
+
+class BlendMaterialModel(QtCore.QAbstractTableModel):
+    # One row per blend material, the second column holds the base material linked to its baseColor.
+    # All combo boxes share base_materials, a single sorted string model, and base_material_rows
+    # finds a material's row in it. Rows whose link differs from the scene are kept in changed_rows.
+    def __init__(self, blend_materials, base_materials, links, parent=None):
+        super(BlendMaterialModel, self).__init__(parent)
+        self.blend_materials = blend_materials
+        self.base_materials = QtCore.QStringListModel(base_materials, self)
+        self.base_material_rows = dict((name, row) for row, name in enumerate(base_materials))
+        self.scene_links = list(links)
+        self.links = links
+        self.changed_rows = set()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.blend_materials)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role not in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return None
+        if index.column() == 0:
+            return self.blend_materials[index.row()]
+        return self.links[index.row()]
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if not index.isValid() or index.column() != 1 or role != QtCore.Qt.EditRole:
+            return False
+        self.links[index.row()] = value
+        if value == self.scene_links[index.row()]:
+            self.changed_rows.discard(index.row())
+        else:
+            self.changed_rows.add(index.row())
+        self.dataChanged.emit(index, index)
+        return True
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        if index.column() == 1:
+            flags |= QtCore.Qt.ItemIsEditable
+        return flags
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return ["blend material", "base material"][section]
+        return None
+
+
+class BaseMaterialDelegate(QtWidgets.QStyledItemDelegate):
+    # Combo box editor on top of the model's shared base material list, only created for the cell being edited
+    def createEditor(self, parent, option, index):
+        base_cbx = QtWidgets.QComboBox(parent)
+        base_cbx.setModel(index.model().base_materials)
+        base_cbx.activated.connect(lambda: self.commitData.emit(base_cbx))
+        return base_cbx
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentIndex(index.model().base_material_rows.get(index.data(QtCore.Qt.EditRole), -1))
+
+    def setModelData(self, editor, model, index):
+        if editor.currentIndex() >= 0:
+            model.setData(index, editor.currentText())
 
 
 class MaterialLinker(QtWidgets.QDialog):
-    def __init__(self, parent=getMainWindow()):
-        super(MaterialLinker, self).__init__(parent)
+    def __init__(self, parent=None):
+        super(MaterialLinker, self).__init__(parent or getMainWindow())
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowContextHelpButtonHint)
         self.setMinimumSize(450, 80)
         self.setWindowTitle("Material Linker")
         self.setObjectName("MaterialLinker")
 
+        self.export_btn = QtWidgets.QPushButton("Export Plan...")
+        self.export_btn.setToolTip("write the changed links to a manifest instead, see ApplyManifest.py")
         self.ok_btn = QtWidgets.QPushButton("Apply")
         self.cancel_btn = QtWidgets.QPushButton("Cancel")
 
         self.main_layout = QtWidgets.QVBoxLayout(self)
 
-        self.blend_materials_layout = QtWidgets.QVBoxLayout(self)
-        self.base_materials_layout = QtWidgets.QVBoxLayout(self)
-        self.materials_layout = QtWidgets.QHBoxLayout(self)
-        self.materials_layout.addLayout(self.blend_materials_layout)
-        self.materials_layout.addLayout(self.base_materials_layout)
-        self.fillMaterialLayout()
+        # the view only paints the visible rows, so thousands of blend materials open instantly
+        self.materials_view = QtWidgets.QTableView()
+        self.refresh()
+        self.materials_view.setItemDelegateForColumn(1, BaseMaterialDelegate(self.materials_view))
+        self.materials_view.setEditTriggers(QtWidgets.QAbstractItemView.AllEditTriggers)
+        self.materials_view.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.materials_view.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.materials_view.verticalHeader().hide()
+        self.materials_view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.materials_view.verticalHeader().setDefaultSectionSize(35)
+        self.materials_view.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
 
         self.action_layout = QtWidgets.QHBoxLayout(self)
         self.action_layout.setAlignment(QtCore.Qt.AlignRight)
 
+        self.action_layout.addWidget(self.export_btn)
         self.action_layout.addWidget(self.ok_btn)
         self.action_layout.addWidget(self.cancel_btn)
 
-        self.materials_intermediate_widget = QtWidgets.QWidget()
-        self.materials_intermediate_widget.setLayout(self.materials_layout)
-        self.scroll_area = QtWidgets.QScrollArea()
-        self.scroll_area.setFocusPolicy(QtCore.Qt.NoFocus)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setFrameShape(QtWidgets.QFrame.NoFrame);
-        self.scroll_area.setWidget(self.materials_intermediate_widget)
-
-        self.main_layout.addWidget(self.scroll_area)
+        self.main_layout.addWidget(self.materials_view)
         self.main_layout.addLayout(self.action_layout)
 
+        self.export_btn.clicked.connect(self.exportPlan)
         self.ok_btn.clicked.connect(self.apply)
         self.cancel_btn.clicked.connect(self.cancel)
 
+    def refresh(self):
+        # reads the materials and links from the scene again, the Launcher calls it when it shows the dialog again
+        with Instrument.run("MaterialLinker"):
+            with Instrument.stage("scan"):
+                self.model = self.createModel()
+        self.materials_view.setModel(self.model)
+
     def apply(self):
         self.doSomething()
 
     def cancel(self):
         self.close()
 
+    def exportPlan(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Plan", "", "Manifests (*.json *.msgpack)", options=QtWidgets.QFileDialog.DontUseNativeDialog)
+        if path:
+            writeManifest(path, [planLinks(self.changedLinks())], tool="linker")
+
     def doSomething(self):
-        for i in range(self.blend_materials_layout.count()):
-            pm.connectAttr(pm.PyNode(self.base_materials_layout.itemAt(i).widget().currentText()).outColor, pm.PyNode(self.blend_materials_layout.itemAt(i).widget().text()).baseColor, force=True)
+        # only the rows that were changed in the dialog are connected, as one undo step
+        with Instrument.run("MaterialLinker"):
+            with Instrument.stage("plan"):
+                plan = planLinks(self.changedLinks())
+            applyPlan(plan)
         self.close()
 
-    def fillMaterialLayout(self):
-        for lbl in self.getBlendMaterials():
-            self.blend_materials_layout.addWidget(lbl)
-            dropdown = self.getBaseMaterials()
-            self.base_materials_layout.addWidget(dropdown)
-        self.setBaseMaterials(dropdown)
-
-    def getBlendMaterials(self):
-        materials = [material for material in pm.ls(mat=True) if material.type() == "RedshiftMaterialBlender"]
-        blend_lbls = []
-        for material in materials:
-            blend_lbls.append(QtWidgets.QLabel(material._name))
-            blend_lbls[-1].setMinimumHeight(35)
-        return blend_lbls
-
-    def getBaseMaterials(self):
-        materials = [material for material in pm.ls(mat=True) if material.type() == "RedshiftMaterial"]
-        str_materials = map(lambda x: x._name, materials)
-        str_materials.sort()
-        base_cbx = QtWidgets.QComboBox()
-        base_cbx.setMinimumHeight(35)
-        base_cbx.addItems(str_materials)
-        return base_cbx
+    def changedLinks(self):
+        return [(self.model.blend_materials[row], self.model.links[row]) for row in sorted(self.model.changed_rows)]
 
-    def setBaseMaterials(self,dropdown):
-        for i in range(self.blend_materials_layout.count()):
-            if pm.listConnections(pm.PyNode(self.blend_materials_layout.itemAt(i).widget().text()).baseColor):
-                for x in range(dropdown.count()):
-                    if dropdown.itemText(x) == pm.listConnections(pm.PyNode(self.blend_materials_layout.itemAt(i).widget().text()).baseColor)[0]._name:
-                        self.base_materials_layout.itemAt(i).widget().setCurrentIndex(x)
+    def createModel(self):
+        blend_materials, base_materials = getSceneMaterials()
+        links = getBaseMaterialLinks(blend_materials)
+        return BlendMaterialModel(blend_materials, base_materials, links, self)
 
 
 if __name__ == "__main__":
-    for entry in QtWidgets.QApplication.allWidgets():
-        if entry.objectName() == "MaterialLinker":
-            entry.close()
-    loadVray()
-    material_linker_dialog = MaterialLinker()
-    material_linker_dialog.show()
\ No newline at end of file
+    import Launcher
+    material_linker_dialog = Launcher.show("linker")
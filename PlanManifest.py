@@ -0,0 +1,90 @@
+# Writes the scene changes an importer would make to a manifest, without Maya:
+#
+#   python PlanManifest.py substance D:/libraries/wood D:/libraries/metal -o D:/plans/library.json --renderer vray
+#   python PlanManifest.py axf D:/axf/fabrics -o D:/plans/fabrics.json --render-setup
+#   python PlanManifest.py mus parts.txt -o D:/plans/parts.msgpack
+#
+# The manifest holds the plans (see ScenePlan.py) for a scene without these materials, one per
+# folder: the nodes, attributes, connections and render layers to create. ApplyManifest.py builds
+# them in mayapy, the dialogs' "Export Plan..." buttons write the same manifests for the open scene.
+# A manifest whose content didn't change is left alone, so build tools can go by its modification time.
+
+import argparse
+import os
+import sys
+
+import Instrument
+from ScenePlan import ScenePlan, writeManifest, requireMsgpack
+
+tools = ["substance", "axf", "mus"]
+
+
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Plan the materials of the importers and write them to a json or msgpack manifest.")
+    parser.add_argument("tool", choices=tools, help="importer to plan")
+    parser.add_argument("inputs", nargs="+", help="folders with texture maps or AxF files, or text files with part lists")
+    parser.add_argument("-o", "--output", required=True, help="manifest to write, .msgpack for msgpack, json otherwise")
+    parser.add_argument("--recursive", action="store_true", help="substance: also plan the textures in subfolders")
+    parser.add_argument("--renderer", default="redshift", help="substance: shader rules to build the materials with (default: redshift)")
+    parser.add_argument("--resolution", metavar="TIER", help="substance: resolution variant of the maps to use")
+    parser.add_argument("--render-setup", action="store_true", help="axf: also plan a render layer per material and the render settings")
+    parser.add_argument("--no-cache", action="store_true", help="don't use the folder listings cached by earlier scans")
+    return parser.parse_args(argv)
+
+
+def planInputs(options):
+    # returns the plans for all inputs of the tool
+    use_cache = not options.no_cache
+    if options.tool == "substance":
+        import SubstancePlan
+        plans = []
+        for folder in options.inputs:
+            plans.extend(SubstancePlan.planLibrary(folder, recursive=options.recursive, use_cache=use_cache,
+                                                   resolution=options.resolution, renderer=options.renderer))
+        return plans
+
+    if options.tool == "axf":
+        import AxFPlan
+        plans = [AxFPlan.planMaterials(folder, use_cache) for folder in options.inputs]
+        if options.render_setup:
+            # the render layers cover the materials of all folders, like BatchImport.py --render-setup
+            materials = [name for plan in plans for key, node_type, name, flags in plan.nodes]
+            plans.append(AxFPlan.planRenderSettings(AxFPlan.planRenderLayers(ScenePlan(), materials)))
+        return plans
+
+    import MUSPlan
+    text = []
+    for path in options.inputs:
+        with open(path) as part_list:
+            text.append(part_list.read())
+    # without a scene nothing is taken yet, Maya numbers clashing names when the manifest is applied
+    part_names = list(MUSPlan.iter_part_names("\n".join(text)))
+    return [MUSPlan.plan_blend_materials(part_names, set())]
+
+
+def main(argv=None):
+    options = parseArguments(argv)
+    for path in options.inputs:
+        if not os.path.exists(path):
+            sys.stderr.write("Path is invalid: {0}\n".format(path))
+            return 1
+    if options.output.endswith(".msgpack"):
+        # fail before planning a big library
+        requireMsgpack()
+    # the texture and AxF paths in the manifest must not depend on where it's applied
+    options.inputs = [os.path.abspath(path) for path in options.inputs]
+
+    with Instrument.run("PlanManifest"):
+        with Instrument.stage("plan"):
+            plans = planInputs(options)
+        with Instrument.stage("write"):
+            written = writeManifest(options.output, plans, tool=options.tool, options={
+                "inputs": options.inputs, "recursive": options.recursive, "renderer": options.renderer,
+                "resolution": options.resolution, "render_setup": options.render_setup})
+    node_count = sum(len(plan.nodes) + len(plan.shading_groups) for plan in plans)
+    print("{0} nodes in {1} plans -> {2}{3}".format(node_count, len(plans), options.output, "" if written else " (unchanged)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# On-disk cache of folder scans, so clicking Apply again on an unchanged library doesn't re-list it.
+#
+# Entries are keyed on the folder path and validated with the folder's mtime and inode, which
+# change whenever a file is added, removed or renamed. All libraries share one cache file in the
+# user's home folder (vendor drops are often on read-only shares) and the least recently used
+# folders are dropped once more than max_folders are stored.
+
+import os
+import json
+import time
+import tempfile
+import collections
+
+default_cache_path = os.path.join(os.path.expanduser("~"), ".productReplacement", "scanCache.json")
+cache_version = 4
+
+# folders modified less than this many seconds before the scan are not cached, because files
+# added within the filesystem's mtime resolution wouldn't change the key
+racy_seconds = 2
+
+
+class ScanCache(object):
+    def __init__(self, cache_path=None, max_folders=64):
+        self.cache_path = cache_path or os.environ.get("PRODUCT_REPLACEMENT_SCAN_CACHE", default_cache_path)
+        self.max_folders = max_folders
+        self._folders = None
+
+    def get(self, kind, folder):
+        # Returns the records stored for kind ("textures", "axf", ...) in folder, or None if the folder changed
+        folders = self._load()
+        folder = os.path.normpath(folder)
+        entry = folders.get(folder)
+        if entry is None or entry["key"] != folderKey(folder):
+            return None
+        # mark as most recently used
+        folders[folder] = folders.pop(folder)
+        return entry["records"].get(kind)
+
+    def put(self, kind, folder, records):
+        folders = self._load()
+        folder = os.path.normpath(folder)
+        key = folderKey(folder)
+        if key is None or time.time() - key[0] < racy_seconds:
+            return
+        entry = folders.pop(folder, None)
+        if entry is None or entry["key"] != key:
+            entry = {"key": key, "records": {}}
+        entry["records"][kind] = records
+        folders[folder] = entry
+        while len(folders) > self.max_folders:
+            folders.popitem(last=False)
+        self.save()
+
+    def clear(self):
+        self._folders = collections.OrderedDict()
+        self.save()
+
+    def save(self):
+        # the BatchDriver workers all save to the same cache, see saveJson
+        saveJson(self.cache_path, {"version": cache_version, "folders": list(self._folders.items())})
+
+    def _load(self):
+        if self._folders is None:
+            self._folders = collections.OrderedDict()
+            try:
+                with open(self.cache_path, "r") as json_file:
+                    data = json.load(json_file)
+                if data.get("version") == cache_version:
+                    self._folders = collections.OrderedDict((folder, entry) for folder, entry in data["folders"])
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                # a missing or broken cache is simply rebuilt
+                pass
+        return self._folders
+
+
+def folderKey(folder):
+    try:
+        stat = os.stat(folder)
+    except OSError:
+        return None
+    return [stat.st_mtime, stat.st_ino]
+
+
+def saveJson(path, data):
+    # Writes data next to path and swaps it in, so a crash never leaves a half written file. Every
+    # writer gets its own temp file, so processes saving the same file don't trip over each other.
+    # For caches and indexes, which must never break a tool: returns False instead of raising when
+    # the file can't be written, it is then just not updated.
+    temp_path = None
+    try:
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        handle, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=folder)
+        with os.fdopen(handle, "w") as json_file:
+            json.dump(data, json_file, separators=(",", ":"))
+        replaceFile(temp_path, path)
+        temp_path = None
+        return True
+    except (IOError, OSError):
+        return False
+    finally:
+        if temp_path is not None:
+            removeFile(temp_path)
+
+
+def replaceFile(source, destination):
+    if hasattr(os, "replace"):
+        os.replace(source, destination)
+    else:
+        # Python 2 on windows can't rename onto an existing file
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+
+def removeFile(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_scan_cache = None
+
+def getScanCache():
+    # the cache shared by all tools in this Maya session
+    global _scan_cache
+    if _scan_cache is None:
+        _scan_cache = ScanCache()
+    return _scan_cache
@@ -0,0 +1,357 @@
+# Plain-data description of the nodes, attributes and connections a tool wants to create.
+#
+# Building a plan does not touch Maya: the importers first compute the whole graph as
+# lists of plain values and then hand it to applyPlan, which creates everything inside a
+# single undo chunk. applyPlan sends the plan to Maya as a few MEL scripts instead of one
+# pymel call per node, attribute and connection. Because it takes the pm module as an
+# argument, a plan can also be checked against a recording stand-in for pymel.core.
+#
+# Plans can be saved as manifests (writeManifest, readManifest) to preview what a tool would
+# do, or to compute them without Maya and apply them later, see PlanManifest.py and
+# ApplyManifest.py. A manifest is json with one plan row per line, so two of them diff row
+# by row, or msgpack if the file name ends in .msgpack and msgpack is installed.
+
+import os
+import re
+import json
+import hashlib
+import Instrument
+from ScanCache import replaceFile
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+manifest_version = 1
+# characters Maya doesn't allow in node names, it replaces them with _
+invalid_name_chars = re.compile(r"[^A-Za-z0-9_]")
+# commands per mel.eval call, keeps the scripts of big libraries at a few MB
+mel_batch_size = 20000
+
+try:
+    string_types = (str, unicode)
+except NameError:
+    string_types = (str,)
+plan_fields = ["plugins", "existing", "nodes", "shading_groups", "added_attributes", "attributes",
+               "connections", "members", "render_layers"]
+
+
+class ScenePlan(object):
+    def __init__(self):
+        self.plugins = []           # plugins to load before anything is created
+        self.existing = []          # [key, name] of nodes that are already in the scene
+        self.nodes = []             # [key, node_type, name, flags]
+        self.shading_groups = []    # [key, name]
+        self.added_attributes = []  # [key, attribute, flags]
+        self.attributes = []        # [key, attribute, value]
+        self.connections = []       # [source_key, source_attribute, destination_key, destination_attribute(, force)]
+        self.members = []           # [set_key, [member_key, ...]]
+        self.render_layers = None   # None, or [layer, collection, [member name, ...], [override, ...]], see addRenderLayer
+        self._keys = set()
+
+    @classmethod
+    def fromDict(cls, data):
+        # the inverse of toDict, fields missing from data stay empty
+        plan = cls()
+        for field in plan_fields:
+            if data.get(field) is not None:
+                setattr(plan, field, [list(row) if isinstance(row, (list, tuple)) else row for row in data[field]])
+        for rows in (plan.existing, plan.nodes, plan.shading_groups):
+            for row in rows:
+                plan._addKey(row[0])
+        return plan
+
+    def requirePlugin(self, plugin):
+        if plugin not in self.plugins:
+            self.plugins.append(plugin)
+
+    def addExisting(self, key, name=None):
+        # lets the plan set attributes on and connect to a node that is already in the scene
+        self._addKey(key)
+        self.existing.append([key, name or key])
+        return key
+
+    def addNode(self, key, node_type, name=None, **flags):
+        # the node is named validNodeName(name or key), so Maya doesn't rename it and a later
+        # import can find it again under that name
+        self._addKey(key)
+        self.nodes.append([key, node_type, validNodeName(name or key), flags])
+        return key
+
+    def addShadingGroup(self, key, name=None):
+        # shading groups are sets, they are created with pm.sets instead of pm.shadingNode
+        self._addKey(key)
+        self.shading_groups.append([key, validNodeName(name or key)])
+        return key
+
+    def _addKey(self, key):
+        if self.hasNode(key):
+            raise ValueError("node '{0}' is already part of the plan".format(key))
+        self._keys.add(key)
+
+    def hasNode(self, key):
+        return key in self._keys
+
+    def addAttr(self, key, attribute, **flags):
+        self.added_attributes.append([key, attribute, flags])
+
+    def setAttr(self, key, attribute, value):
+        self.attributes.append([key, attribute, value])
+
+    def connectAttr(self, source_key, source_attribute, destination_key, destination_attribute, force=False):
+        # force replaces whatever is connected to the destination already
+        connection = [source_key, source_attribute, destination_key, destination_attribute]
+        self.connections.append(connection + [True] if force else connection)
+
+    def addMembers(self, set_key, member_keys):
+        # assigns the member nodes to a shading group (or any other set) of the plan
+        self.members.append([set_key, list(member_keys)])
+
+    def replaceRenderLayers(self):
+        # applying the plan replaces all render layers of the scene with the ones added by addRenderLayer
+        if self.render_layers is None:
+            self.render_layers = []
+
+    def addRenderLayer(self, name, collection, members, overrides):
+        # A renderSetup layer with one collection that holds the member nodes (by name), and its
+        # connection overrides as [override name, attribute, source_key, source_attribute].
+        self.replaceRenderLayers()
+        self.render_layers.append([name, collection, list(members), [list(override) for override in overrides]])
+
+    def toDict(self):
+        return dict((field, getattr(self, field)) for field in plan_fields)
+
+
+def validNodeName(name):
+    # name the way Maya stores it: only letters, digits and _, and not starting with a digit
+    name = invalid_name_chars.sub("_", name)
+    return "_" + name if name[:1].isdigit() else name
+
+
+def applyPlan(plan, pm=None, progress=None):
+    # Returns a dict with the name of the node for every key in the plan. Maya may rename nodes on
+    # creation, so attributes and connections are resolved through that dict: one MEL script creates
+    # the nodes and returns their names, a second one sets the attributes, connects and assigns.
+    # progress(stage) is called before each stage ("load plugins", "create nodes", "edit nodes",
+    # "decode" and "connect overrides"), a plan can't be cancelled once it is being applied.
+    if pm is None:
+        import pymel.core as pm
+
+    created = dict((key, name) for key, name in plan.existing)
+    if progress:
+        progress("load plugins")
+    with Instrument.stage("load plugins", commands=len(plan.plugins)):
+        for plugin in plan.plugins:
+            pm.loadPlugin(plugin, quiet=True)
+    pm.undoInfo(openChunk=True, chunkName="applyPlan")
+    try:
+        creations = [(key, "shadingNode {0}-name {1} {2}".format(melFlags(flags, switches=True), melString(name), melString(node_type)))
+                     for key, node_type, name, flags in plan.nodes]
+        creations += [(key, "sets -renderable true -noSurfaceShader true -empty -name {0}".format(melString(name)))
+                      for key, name in plan.shading_groups]
+        if progress:
+            progress("create nodes")
+        with Instrument.stage("create nodes", nodes=len(creations)) as create_stage:
+            for start in range(0, len(creations), mel_batch_size):
+                batch = creations[start:start + mel_batch_size]
+                names = pm.mel.eval(creationScript([command for key, command in batch]))
+                created.update(zip([key for key, command in batch], names))
+                create_stage.commands += 1
+        commands = editCommands(plan, created)
+        if progress:
+            progress("edit nodes")
+        with Instrument.stage("edit nodes") as edit_stage:
+            for start in range(0, len(commands), mel_batch_size):
+                pm.mel.eval("\n".join(commands[start:start + mel_batch_size]))
+                edit_stage.commands += 1
+        if plan.render_layers is not None:
+            with Instrument.stage("render setup", commands=2):
+                applyRenderLayers(plan.render_layers, created, pm, progress)
+    finally:
+        pm.undoInfo(closeChunk=True)
+    return created
+
+
+def creationScript(commands):
+    # a MEL proc that runs the node creating commands and returns the names Maya gave the nodes
+    lines = ["global proc string[] scenePlanCreateNodes() {", "    string $created[];"]
+    lines.extend("    $created[{0}] = `{1}`;".format(i, command) for i, command in enumerate(commands))
+    lines.extend(["    return $created;", "}", "scenePlanCreateNodes();"])
+    return "\n".join(lines)
+
+
+def editCommands(plan, created):
+    # the MEL commands for the added attributes, values, connections and members of the plan
+    commands = []
+    for key, attribute, flags in plan.added_attributes:
+        commands.append("addAttr -longName {0} {1}{2};".format(melString(attribute), melFlags(flags), melString(created[key])))
+    for key, attribute, value in plan.attributes:
+        commands.append(melSetAttr("{0}.{1}".format(created[key], attribute), value))
+    for connection in plan.connections:
+        source_key, source_attribute, destination_key, destination_attribute = connection[:4]
+        commands.append("connectAttr {0}{1} {2};".format("-force " if connection[4:] == [True] else "",
+                                                        melString("{0}.{1}".format(created[source_key], source_attribute)),
+                                                        melString("{0}.{1}".format(created[destination_key], destination_attribute))))
+    for set_key, member_keys in plan.members:
+        commands.append("sets -edit -forceElement {0} {1};".format(melString(created[set_key]), " ".join(melString(created[key]) for key in member_keys)))
+    return commands
+
+
+def melString(value):
+    return '"{0}"'.format(value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t"))
+
+
+def melNumber(value):
+    return repr(value) if isinstance(value, float) else str(int(value))
+
+
+def melFlags(flags, switches=False):
+    # "-flag value " per flag. With switches, flags set to True are given without a value
+    # (like shadingNode -asShader) and flags set to False are left out.
+    arguments = []
+    for flag, value in sorted(flags.items()):
+        if switches and isinstance(value, bool):
+            if value:
+                arguments.append("-{0} ".format(flag))
+        elif isinstance(value, bool):
+            arguments.append("-{0} {1} ".format(flag, "true" if value else "false"))
+        elif isinstance(value, string_types):
+            arguments.append("-{0} {1} ".format(flag, melString(value)))
+        else:
+            arguments.append("-{0} {1} ".format(flag, melNumber(value)))
+    return "".join(arguments)
+
+
+def melSetAttr(plug, value):
+    # strings need -type "string", compound values like colors are given as their elements
+    if isinstance(value, string_types):
+        return 'setAttr -type "string" {0} {1};'.format(melString(plug), melString(value))
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return "setAttr {0} {1};".format(melString(plug), " ".join(melNumber(item) for item in values))
+
+
+def renderSetupDocument(render_layers, created):
+    # The same json renderSetup exports, with the sources of the connection overrides resolved to the created nodes
+    documents = []
+    for name, collection_name, members, overrides in render_layers:
+        children = [{"connectionOverride": {
+            "name": override_name,
+            "enabled": True,
+            "selfEnabled": True,
+            "attribute": attribute,
+            "connectionStr": "{0}.{1}".format(created[source_key], source_attribute)}}
+            for override_name, attribute, source_key, source_attribute in overrides]
+        collection = {
+            "name": collection_name,
+            "selfEnabled": True,
+            "selfIsolated": False,
+            "selector": {"simpleSelector": {
+                "pattern": "",
+                "staticSelection": "\n".join(members),
+                "typeFilter": 0,
+                "customFilterValue": ""}},
+            "children": children}
+        documents.append({"renderSetupLayer": {
+            "name": name,
+            "renderable": True,
+            "visibility": False,
+            "collections": [{"collection": collection}]}})
+    return {"renderSetup": {"name": "renderSetup", "renderLayers": documents}}
+
+
+def applyRenderLayers(render_layers, created, pm, progress=None):
+    # Decodes all layers in one go, instead of building them call by call, which makes renderSetup
+    # update after every change. Then makes sure every override is connected to its source, with
+    # one query and one script for all of them. The decode is a single renderSetup call, it reports
+    # no progress of its own and can't be interrupted.
+    import maya.app.renderSetup.model.renderSetup as renderSetup
+    if progress:
+        progress("decode")
+    renderSetup.instance().decode(renderSetupDocument(render_layers, created), renderSetup.DECODE_AND_OVERWRITE, None)
+    overrides = [(override_name + ".attrValue", "{0}.{1}".format(created[source_key], source_attribute))
+                 for layer in render_layers for override_name, attribute, source_key, source_attribute in layer[3]]
+    if not overrides:
+        return
+    if progress:
+        progress("connect overrides")
+    plugs = [plug for plug, source in overrides]
+    connected = set(str(plug) for plug in pm.listConnections(plugs, s=True, d=False, plugs=True, connections=True)[::2])
+    commands = ["connectAttr -force {0} {1};".format(melString(source), melString(plug)) for plug, source in overrides if plug not in connected]
+    if commands:
+        pm.mel.eval("\n".join(commands))
+
+
+def manifestHash(plans):
+    # identifies the content of a manifest, two manifests with the same hash build the same nodes
+    text = json.dumps([plan.toDict() for plan in plans], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def formatManifest(manifest):
+    # json with every row of a plan on its own line and the keys sorted, so manifests diff row by row
+    lines = ["{"]
+    for key in sorted(manifest):
+        if key != "plans":
+            lines.append("  {0}: {1},".format(json.dumps(key), json.dumps(manifest[key], sort_keys=True)))
+    lines.append('  "plans": [')
+    for i, plan in enumerate(manifest["plans"]):
+        lines.append("    {")
+        for j, field in enumerate(plan_fields):
+            rows = plan[field]
+            separator = "," if j < len(plan_fields) - 1 else ""
+            if not rows:
+                lines.append("      {0}: {1}{2}".format(json.dumps(field), json.dumps(rows), separator))
+                continue
+            lines.append("      {0}: [".format(json.dumps(field)))
+            lines.extend("        {0}{1}".format(json.dumps(row, sort_keys=True), "," if k < len(rows) - 1 else "")
+                         for k, row in enumerate(rows))
+            lines.append("      ]" + separator)
+        lines.append("    }" + ("," if i < len(manifest["plans"]) - 1 else ""))
+    lines.append("  ]")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def requireMsgpack():
+    if msgpack is None:
+        raise ImportError("msgpack manifests need the msgpack package, use a .json manifest instead")
+
+
+def writeManifest(path, plans, tool=None, options=None):
+    # Writes the plans to path, returns False when the file already had this content and was left
+    # alone, so build tools that look at modification times don't redo work.
+    manifest = {"version": manifest_version, "tool": tool, "options": options or {},
+                "hash": manifestHash(plans), "plans": [plan.toDict() for plan in plans]}
+    if path.endswith(".msgpack"):
+        requireMsgpack()
+        data = msgpack.packb(manifest, use_bin_type=True)
+    else:
+        data = formatManifest(manifest).encode("utf-8")
+    if os.path.isfile(path):
+        with open(path, "rb") as manifest_file:
+            if manifest_file.read() == data:
+                return False
+    folder = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    temp_path = "{0}.{1}.tmp".format(path, os.getpid())
+    with open(temp_path, "wb") as manifest_file:
+        manifest_file.write(data)
+    replaceFile(temp_path, path)
+    return True
+
+
+def readManifest(path):
+    # the manifest as a dict, with its plans as ScenePlans
+    with open(path, "rb") as manifest_file:
+        data = manifest_file.read()
+    if path.endswith(".msgpack"):
+        requireMsgpack()
+        manifest = msgpack.unpackb(data, raw=False)
+    else:
+        manifest = json.loads(data.decode("utf-8"))
+    if manifest.get("version") != manifest_version:
+        raise ValueError("{0} is a version {1} manifest, expected version {2}".format(path, manifest.get("version"), manifest_version))
+    manifest["plans"] = [ScenePlan.fromDict(plan) for plan in manifest["plans"]]
+    return manifest
@@ -1,34 +1,108 @@
-import pymel.core as pm
-import os, json
+import os
 import maya.OpenMaya as om
-from shutil import copyfile
+import Instrument
+import TextureStaging
+from AssetRegistry import getAssetRegistry
+from LazyModule import lazyImport
+
+pm = lazyImport("pymel.core")
+
+load_modes = ["import", "reference", "proxy"]
+
+# proxy file extension -> plugin, proxy node type, file attribute, mesh output
+proxy_types = {
+    ".rs": ("redshift4maya", "RedshiftProxyMesh", "fileName", "outMesh"),
+    ".vrmesh": ("vrayformaya", "VRayMesh", "fileName", "output"),
+}
 
 def loadVray():
     pm.loadPlugin("vrayformaya", quiet=True)
 
 
 class shaderballs():
-    def __init__(self):
-        self.my_path = "C:/Users/wen/PycharmProjects/Maya/ShaderBall"
-        asset = self.get_asset(self.my_path)
-        self.copy_textures(asset)
-        pm.importFile(os.path.join(self.my_path, asset["maPath"]))
-
-    def get_asset(self, asset_path):
-        with open(os.path.join(asset_path, os.path.basename(asset_path) + ".json"), "r") as json_file:
-            my_json = json.load(json_file)
-            return my_json
-
-    def copy_textures(self, asset):
-        for texture in asset["textureFiles"]:
-            src = os.path.join(self.my_path, texture)
-            dst = os.path.join(pm.workspace(q=True, rootDirectory=True), "sourceimages", os.path.basename(src))
-            if os.path.exists(os.path.dirname(dst)):
-                if not os.path.exists(dst):
-                    copyfile(src, dst)
-            else:
-                om.MGlobal.displayError("Path is invalid")
-
-
-
-shaderballs()
\ No newline at end of file
+    def __init__(self, asset_name="ShaderBall", mode="import"):
+        # mode "import" copies the geometry into the scene, "reference" adds the asset scene as a
+        # shared file reference and "proxy" loads the proxyPath of the manifest as a render proxy.
+        # The AxF render setup and the MUS importer need the SB_Blend and GEO nodes of the asset
+        # scene, so they only work after "import" or "reference", a proxy has none of them.
+        if mode not in load_modes:
+            raise ValueError("mode must be one of {0}".format(", ".join(load_modes)))
+        with Instrument.run("ShaderBall_Scene"):
+            with Instrument.stage("read asset"):
+                asset = self.get_asset(asset_name)
+            self.my_path = asset.folder
+            with Instrument.stage("texture copy"):
+                self.copy_textures(asset)
+            with Instrument.stage(mode + " scene", commands=1):
+                if mode == "import":
+                    pm.importFile(asset.path(asset.ma_path))
+                elif mode == "reference":
+                    self.reference_scene(asset)
+                else:
+                    self.load_proxy(asset)
+
+    def get_asset(self, asset_name):
+        # looked up in the asset registry, see AssetRegistry.py for where it searches
+        return getAssetRegistry().get(asset_name)
+
+    def reference_scene(self, asset):
+        # References the asset scene once, running it again only reloads an unloaded reference. The
+        # nodes go into the root namespace, like an imported scene, because the AxF render setup and the
+        # MUS importer look SB_Blend and GEO up by their bare names.
+        path = os.path.normpath(asset.path(asset.ma_path))
+        for reference in pm.listReferences():
+            if os.path.normcase(os.path.normpath(reference.unresolvedPath())) == os.path.normcase(path):
+                if not reference.isLoaded():
+                    reference.load()
+                return reference
+        return pm.createReference(path, namespace=":", mergeNamespacesOnClash=True)
+
+    def load_proxy(self, asset):
+        # a proxy mesh reading proxyPath at render time, unless one for that file is already in the scene
+        if not asset.proxy_path:
+            raise ValueError("{0} has no proxyPath".format(asset.manifest_path))
+        extension = os.path.splitext(asset.proxy_path)[1].lower()
+        if extension not in proxy_types:
+            raise ValueError("{0}: unknown proxy type '{1}'".format(asset.manifest_path, extension))
+        plugin, node_type, file_attribute, mesh_output = proxy_types[extension]
+        pm.loadPlugin(plugin, quiet=True)
+
+        path = os.path.normcase(os.path.normpath(asset.path(asset.proxy_path)))
+        for proxy in pm.ls(type=node_type):
+            if os.path.normcase(os.path.normpath(proxy.attr(file_attribute).get() or "")) == path:
+                return proxy
+
+        proxy = pm.createNode(node_type, name=asset.name + "_proxy")
+        proxy.attr(file_attribute).set(asset.path(asset.proxy_path), type="string")
+        transform = pm.createNode("transform", name=asset.name)
+        mesh = pm.createNode("mesh", name=asset.name + "Shape", parent=transform)
+        proxy.attr(mesh_output).connect(mesh.inMesh)
+        pm.sets("initialShadingGroup", forceElement=mesh)
+        return proxy
+
+    def copy_textures(self, asset, verify="stat"):
+        # stages the textures into sourceimages of the project with a cancellable progress window
+        sourceimages = os.path.join(pm.workspace(q=True, rootDirectory=True), "sourceimages")
+        pairs = []
+        for texture in asset.texture_files:
+            src = asset.path(texture)
+            pairs.append((src, os.path.join(sourceimages, os.path.basename(src))))
+
+        pm.progressWindow(title="ShaderBall", status="copying textures", progress=0, maxValue=100, isInterruptable=True)
+        def progress(done_bytes, total_bytes):
+            pm.progressWindow(edit=True, progress=int(100 * done_bytes / max(1, total_bytes)))
+            return not pm.progressWindow(query=True, isCancelled=True)
+        try:
+            result = TextureStaging.stageFiles(pairs, verify=verify, progress=progress)
+        finally:
+            pm.progressWindow(endProgress=True)
+
+        for src, error in result.failed:
+            om.MGlobal.displayError("Could not copy {0}: {1}".format(src, error))
+        om.MGlobal.displayInfo("{0} textures copied, {1} up to date{2}".format(
+            len(result.copied), len(result.current), " (cancelled)" if result.cancelled else ""))
+
+
+
+if __name__ == "__main__":
+    shaderballs()
\ No newline at end of file
@@ -0,0 +1,125 @@
+# Which texture map goes into which shader slot, per renderer, read from shaderRules.json.
+#
+# The rule files are read once per session and compiled into dicts, so resolving a map name (a map
+# type or one of its aliases, case insensitive) to its map type is a single lookup in names, which
+# the texture scan does for every file. The planners go through maps in order instead, the order
+# decides which of two maps sharing a slot comes first. Studios can add conventions or renderers
+# without touching the code: the files in $PRODUCT_REPLACEMENT_SHADER_RULES (separated by
+# os.pathsep) are read after the shipped one. Their aliases are added, and their renderers replace
+# the shipped ones, or extend one of them with "base": "<renderer>" and only the keys that differ.
+#
+#   {"aliases": {"basecolor": ["diff"]},
+#    "renderers": {"redshift_studio": {"base": "redshift", "material": {"type": "RedshiftMaterial", "prefix": "mat_"}}}}
+
+import os
+import json
+import collections
+
+default_rules_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shaderRules.json")
+rules_version = 1
+bump_kinds = ("height", "normal")
+
+
+class MapRule(object):
+    __slots__ = ("map_type", "slot", "output", "color_space", "bump", "material_attributes")
+
+    def __init__(self, map_type, slot, output, color_space="Raw", bump=None, material_attributes=None):
+        self.map_type = map_type
+        self.slot = slot
+        self.output = output
+        self.color_space = color_space
+        self.bump = bump
+        self.material_attributes = material_attributes or {}
+
+    def __repr__(self):
+        return "MapRule({0!r}, {1!r})".format(self.map_type, self.slot)
+
+
+class ShaderRules(object):
+    # The compiled rules of one renderer. maps is ordered: maps that share a slot are connected in this
+    # order, so it decides which map is the base input of a bump blender (or, without a blender, wins).
+    def __init__(self, renderer, definition, aliases):
+        self.renderer = renderer
+        try:
+            self.plugin = definition["plugin"]
+            # command that turns a texture into the renderer's tiled, mipmapped format, see TextureConvert.py
+            self.converter = definition.get("converter")
+            material = definition["material"]
+            self.material_type = material["type"]
+            self.material_prefix = material.get("prefix", "")
+            self.material_attributes = material.get("attributes", {})
+            bump = definition.get("bump", {})
+            self.bump_nodes = dict((kind, bump[kind]) for kind in bump_kinds if kind in bump)
+            self.bump_blender = bump.get("blender")
+            self.maps = collections.OrderedDict()
+            for entry in definition["maps"]:
+                rule = MapRule(entry["map"], entry["slot"], entry["output"], entry.get("colorSpace", "Raw"),
+                               entry.get("bump"), entry.get("materialAttributes"))
+                if rule.bump is not None and rule.bump not in self.bump_nodes:
+                    raise ValueError("map '{0}' needs a '{1}' bump node".format(rule.map_type, rule.bump))
+                self.maps[rule.map_type] = rule
+        except KeyError as error:
+            raise ValueError("renderer '{0}' is missing {1}".format(renderer, error))
+
+        self.map_types = list(self.maps)
+        # lower case name or alias -> map type
+        self.names = dict((map_type.lower(), map_type) for map_type in self.maps)
+        for map_type, map_aliases in aliases.items():
+            if map_type in self.maps:
+                for alias in map_aliases:
+                    self.names.setdefault(alias.lower(), map_type)
+        self.bump_slots = set(rule.slot for rule in self.maps.values() if rule.bump is not None)
+        # slots where a map can find another one already connected, an incremental import has to look at those
+        slot_counts = collections.Counter(rule.slot for rule in self.maps.values())
+        self.shared_slots = set(slot for slot, count in slot_counts.items() if count > 1) | self.bump_slots
+
+
+def rulesPaths():
+    paths = [default_rules_path]
+    studio_rules = os.environ.get("PRODUCT_REPLACEMENT_SHADER_RULES")
+    if studio_rules:
+        paths.extend(path for path in studio_rules.split(os.pathsep) if path)
+    return paths
+
+
+def loadRules(paths=None):
+    # Returns renderer -> ShaderRules for the rule files in paths, later files override earlier ones
+    definitions = collections.OrderedDict()
+    aliases = {}
+    for path in paths or rulesPaths():
+        with open(path, "r") as json_file:
+            try:
+                data = json.load(json_file, object_pairs_hook=collections.OrderedDict)
+            except ValueError as error:
+                raise ValueError("{0}: {1}".format(path, error))
+        if data.get("version", rules_version) != rules_version:
+            raise ValueError("{0}: unsupported rules version {1}".format(path, data.get("version")))
+        for map_type, map_aliases in data.get("aliases", {}).items():
+            aliases.setdefault(map_type, []).extend(map_aliases)
+        for renderer, definition in data.get("renderers", {}).items():
+            if "base" in definition:
+                if definition["base"] not in definitions:
+                    raise ValueError("{0}: renderer '{1}' extends unknown renderer '{2}'".format(path, renderer, definition["base"]))
+                merged = collections.OrderedDict(definitions[definition["base"]])
+                merged.update((key, value) for key, value in definition.items() if key != "base")
+                definition = merged
+            definitions[renderer] = definition
+    return collections.OrderedDict((renderer, ShaderRules(renderer, definition, aliases))
+                                   for renderer, definition in definitions.items())
+
+
+_rules = None
+
+def getRules(renderer="redshift"):
+    # the rules of renderer, all rule files are read the first time this is called
+    global _rules
+    if _rules is None:
+        _rules = loadRules()
+    if renderer not in _rules:
+        raise KeyError("no shader rules for renderer '{0}', known are {1}".format(renderer, ", ".join(_rules)))
+    return _rules[renderer]
+
+
+def rendererNames():
+    getRules()
+    return list(_rules)
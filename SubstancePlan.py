@@ -0,0 +1,171 @@
+# Maya-free half of ImportSubstanceTextures: the node graph for the materials in a folder of
+# substance maps, as a ScenePlan. PlanManifest.py uses it to write manifests without Maya.
+
+import Instrument
+from ScenePlan import ScenePlan, validNodeName
+from TextureScan import indexTextures, crawlTextureIndexes, textureSetSignature
+from ScanCache import getScanCache
+from ShaderRules import getRules
+
+p2d_connections = [("outUV", "uvCoord"), ("outUvFilterSize", "uvFilterSize"), ("vertexCameraOne", "vertexCameraOne"),
+                   ("vertexUvOne", "vertexUvOne"), ("vertexUvThree", "vertexUvThree"), ("vertexUvTwo", "vertexUvTwo"),
+                   ("coverage", "coverage"), ("mirrorU", "mirrorU"), ("mirrorV", "mirrorV"), ("noiseUV", "noiseUV"),
+                   ("offset", "offset"), ("repeatUV", "repeatUV"), ("rotateFrame", "rotateFrame"), ("rotateUV", "rotateUV"),
+                   ("stagger", "stagger"), ("translateFrame", "translateFrame"), ("wrapU", "wrapU"), ("wrapV", "wrapV")]
+
+class SceneSnapshot(object):
+    # What a previous import left in the scene, as far as an incremental import needs to know.
+    # Nodes are listed by their names in the scene, see ScenePlan.validNodeName.
+    def __init__(self):
+        self.materials = set()
+        self.file_nodes = {}        # name: (fileTextureName, textureSignature or None if the node has no signature)
+        self.p2ds = {}              # material: place2dTexture
+        self.slot_inputs = {}       # material: {slot: [node connected to the slot, number of inputs]}, see planConnectTexture
+
+def iterTextureIndexes(search_path, rules, recursive=False, use_cache=True, resolution=None, **crawl_options):
+    # the TextureScan index of search_path, or with recursive of every folder below it as soon as it's listed
+    if not recursive:
+        with Instrument.stage("scan"):
+            texture_index = indexTextures(search_path, rules.names, cache=getScanCache() if use_cache else None, resolution=resolution)
+        yield texture_index
+        return
+    crawl = crawlTextureIndexes(search_path, rules.names, resolution=resolution, **crawl_options)
+    for folder, texture_index in Instrument.timedIterator("scan", crawl):
+        yield texture_index
+
+def planLibrary(search_path, recursive=False, use_cache=True, resolution=None, renderer="redshift", **crawl_options):
+    # The plans SetupMaterials applies to a scene without these materials, one per folder
+    rules = getRules(renderer)
+    plans = []
+    for texture_index in iterTextureIndexes(search_path, rules, recursive, use_cache, resolution, **crawl_options):
+        with Instrument.stage("plan"):
+            plans.append(planMaterials(texture_index, rules=rules))
+    return plans
+
+def planMaterials(texture_index, plan=None, scene=None, rules=None):
+    # Computes the complete node graph for all materials in a TextureScan index without touching the scene.
+    # With a SceneSnapshot, materials that already exist are updated instead (see planMaterialUpdate).
+    rules = rules or getRules()
+    if plan is None:
+        plan = ScenePlan()
+    plan.requirePlugin(rules.plugin)
+    for material_name, textures in texture_index.items():
+        if scene is not None and validNodeName(rules.material_prefix + material_name) in scene.materials:
+            planMaterialUpdate(plan, material_name, textures, scene, rules)
+            continue
+        material = planMaterial(plan, material_name, rules)
+        p2d = plan.addNode(material + "_p2d", "place2dTexture", asUtility=True)
+        slot_inputs = {}
+        # go through the maps in rule order, so a height map always ends up as the base bump input
+        for rule in rules.maps.values():
+            if rule.map_type in textures and isSlotFree(rule, slot_inputs, rules):
+                file_texture = planFileTexture(plan, textures[rule.map_type], p2d, rule)
+                planConnectTexture(plan, material, file_texture, rule, slot_inputs, rules)
+    return plan
+
+def planMaterialUpdate(plan, material_name, textures, scene, rules=None):
+    # Adds the maps that are missing from an existing material and repoints file nodes whose
+    # texture moved or was overwritten. Everything else is left alone.
+    rules = rules or getRules()
+    material_node = validNodeName(rules.material_prefix + material_name)
+    material = None
+    p2d = None
+    slot_inputs = {}
+    for rule in rules.maps.values():
+        if rule.map_type not in textures:
+            continue
+        texture = textures[rule.map_type]
+        file_node = validNodeName(texture.name)
+        if file_node in scene.file_nodes:
+            path, signature = scene.file_nodes[file_node]
+            new_signature = textureSetSignature(texture)
+            if path != texture.path or signature != new_signature:
+                file_texture = plan.addExisting(texture.name, file_node)
+                if signature is None:
+                    plan.addAttr(file_texture, "textureSignature", dataType="string")
+                plan.setAttr(file_texture, "fileTextureName", texture.path)
+                plan.setAttr(file_texture, "uvTilingMode", 3 if texture.tiles else 0)
+                plan.setAttr(file_texture, "textureSignature", new_signature)
+            continue
+        if not isSlotFree(rule, scene.slot_inputs.get(material_node, {}), rules) or \
+                not isSlotFree(rule, slot_inputs, rules):
+            continue
+
+        if material is None:
+            material = plan.addExisting(rules.material_prefix + material_name, material_node)
+            if material_node in scene.p2ds:
+                p2d = plan.addExisting(scene.p2ds[material_node])
+            else:
+                p2d = plan.addNode(material + "_p2d", "place2dTexture", asUtility=True)
+            for slot, (node, input_count) in scene.slot_inputs.get(material_node, {}).items():
+                slot_inputs[slot] = [node if plan.hasNode(node) else plan.addExisting(node), input_count]
+        file_texture = planFileTexture(plan, texture, p2d, rule)
+        planConnectTexture(plan, material, file_texture, rule, slot_inputs, rules)
+
+def planMaterial(plan, material_name, rules=None):
+    rules = rules or getRules()
+    material = plan.addNode(rules.material_prefix + material_name, rules.material_type, asShader=True)
+    for attribute, value in rules.material_attributes.items():
+        plan.setAttr(material, attribute, value)
+    return material
+
+def planFileTexture(plan, texture, p2d, rule):
+    file_texture_node = plan.addNode(texture.name, "file", asTexture=True, isColorManaged=True)
+    plan.setAttr(file_texture_node, "fileTextureName", texture.path)
+    if texture.tiles:
+        # UDIM (Mari), Maya finds the other tiles from the name of the first one
+        plan.setAttr(file_texture_node, "uvTilingMode", 3)
+    # lets an incremental import notice a texture that was overwritten in place
+    plan.addAttr(file_texture_node, "textureSignature", dataType="string")
+    plan.setAttr(file_texture_node, "textureSignature", textureSetSignature(texture))
+    plan.setAttr(file_texture_node, "colorSpace", rule.color_space)
+    # all file nodes of a material share one place2dTexture
+    for p2d_attr, file_attr in p2d_connections:
+        plan.connectAttr(p2d, p2d_attr, file_texture_node, file_attr)
+    return file_texture_node
+
+def isSlotFree(rule, slot_inputs, rules):
+    # False when another map is connected to the slot already and can't be blended with this one
+    return rule.slot not in slot_inputs or bool(rule.bump and rules.bump_blender)
+
+def planConnectTexture(plan, material, file_texture, rule, slot_inputs, rules=None):
+    # slot_inputs keeps track of the node connected to each slot of the material and how many inputs it has.
+    # Bump maps go through a bump node, and through a bump blender if the renderer has one, so several
+    # bump maps add up. Otherwise the first map connected to a slot wins, see isSlotFree.
+    rules = rules or getRules()
+    blender = rules.bump_blender if rule.bump else None
+    input_node, input_slot = material, rule.slot
+    for attribute, value in rule.material_attributes.items():
+        plan.setAttr(material, attribute, value)
+
+    if rule.bump:
+        bump = rules.bump_nodes[rule.bump]
+        bm = plan.addNode(file_texture + "_bm", bump["type"], name=material + "_bm", asUtility=True)
+        for attribute, value in bump.get("attributes", {}).items():
+            plan.setAttr(bm, attribute, value)
+        if blender is None:
+            plan.connectAttr(bm, bump["output"], material, rule.slot)
+            slot_inputs[rule.slot] = [bm, 1]
+        else:
+            # insert blender before bumpnode
+            if rule.slot not in slot_inputs:
+                bb = plan.addNode(material + "_" + rule.slot + "_bb", blender["type"], name=material + "_bb", asUtility=True)
+                plan.connectAttr(bb, blender["output"], material, rule.slot)
+                for attribute, value in blender.get("attributes", {}).items():
+                    plan.setAttr(bb, attribute, value)
+                slot_inputs[rule.slot] = [bb, 0]
+            bb, connection_count = slot_inputs[rule.slot]
+
+            # connect bumpnode to blender
+            if connection_count == 0:
+                plan.connectAttr(bm, bump["output"], bb, blender["baseInput"])
+            else:
+                connection_number = connection_count - 1
+                plan.connectAttr(bm, bump["output"], bb, blender["input"].format(connection_number))
+                plan.setAttr(bb, blender["weight"].format(connection_number), 1)
+            slot_inputs[rule.slot][1] += 1
+        input_node, input_slot = bm, bump["input"]
+    else:
+        slot_inputs[rule.slot] = [file_texture, 1]
+
+    plan.connectAttr(file_texture, rule.output, input_node, input_slot)
@@ -0,0 +1,162 @@
+# Converts textures to the tiled, mipmapped format of the renderer before rendering, so the farm
+# doesn't convert every texture again on every node at render time.
+#
+# The converter of a renderer is set in shaderRules.json ("converter"), its command gets the source
+# and output path filled in. Converted files are named after the md5 of their source content, so
+# a texture is never converted twice, not even when it's copied to another library or renamed. They are
+# written to $PRODUCT_REPLACEMENT_TEXTURE_CACHE, or to a .converted folder next to the textures
+# (hidden from the texture scan). The md5 of every source is remembered with its size and mtime in
+# hashes.json in the cache folder, so unchanged textures aren't read again either.
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+from ScanCache import replaceFile, saveJson, racy_seconds
+from TextureScan import Texture, textureSignature
+from TextureStaging import fileHash
+
+hash_index_name = "hashes.json"
+
+
+def cacheFolder(texture_path):
+    return os.environ.get("PRODUCT_REPLACEMENT_TEXTURE_CACHE") or os.path.join(os.path.dirname(texture_path), ".converted")
+
+
+class HashIndex(object):
+    # md5 of files, recomputed only when their textureSignature (size and mtime) changed
+    def __init__(self, folder):
+        self.path = os.path.join(folder, hash_index_name)
+        self.hashes = {}
+        try:
+            with open(self.path, "r") as json_file:
+                self.hashes = json.load(json_file)
+        except (IOError, OSError, ValueError):
+            pass
+
+    def get(self, path):
+        signature = textureSignature(path)
+        entry = self.hashes.get(path)
+        if entry is None or entry[0] != signature:
+            entry = [signature, fileHash(path)]
+            # a file written within the mtime resolution could change again without changing its signature
+            if time.time() - os.stat(path).st_mtime >= racy_seconds:
+                self.hashes[path] = entry
+        return entry[1]
+
+    def save(self):
+        # several batch workers can convert into the same cache folder, and an index that can't be
+        # written only costs reading the textures again
+        saveJson(self.path, self.hashes)
+
+
+def outputName(texture, tile_path, content_hash, converter):
+    # <hash>[.<udim>]<extension>. All tiles of a UDIM set share the hash of the whole set, so Maya
+    # still finds the other tiles from the name of the first one.
+    udim = ""
+    if texture.tiles:
+        udim = "." + os.path.splitext(tile_path)[0][-4:]
+    return content_hash + udim + converter["extension"]
+
+
+def runConverter(job):
+    # Converts one file into a temporary file and renames it to output, returns an error message or None.
+    # A cache folder that can't be written is an error message too, the texture then keeps its source.
+    source, output, converter = job
+    stem = os.path.splitext(source)[0]
+    command = converter["command"]
+    temp_path = None
+    try:
+        folder = os.path.dirname(output)
+        if not os.path.isdir(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                # another worker may have created it in the meantime
+                if not os.path.isdir(folder):
+                    raise
+        handle, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(output) + ".", suffix=converter["extension"], dir=folder)
+        os.close(handle)
+        command = [argument.format(source=source, output=temp_path) for argument in converter["command"]]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        log = process.communicate()[0]
+        if process.returncode != 0:
+            return "{0} failed with exit code {1}: {2}".format(command[0], process.returncode, log.decode("utf-8", "replace").strip()[-500:])
+        if "result" in converter:
+            # converters that always write next to the source, like redshiftTextureProcessor
+            shutil.move(converter["result"].format(source=source, stem=stem), temp_path)
+        replaceFile(temp_path, output)
+        return None
+    except (IOError, OSError) as error:
+        return "{0}: {1}".format(command[0], error)
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def convertTextures(textures, converter, workers=None, run=True):
+    # Returns a list with the converted Texture for each of textures, or the texture itself when it
+    # couldn't be converted. The converter processes run workers (default: one per cpu) at a time.
+    # With run=False nothing is converted, only textures that were converted before are swapped.
+    hash_indexes = {}
+    jobs = {}
+    planned = []
+    for texture in textures:
+        folder = cacheFolder(texture.path)
+        if folder not in hash_indexes:
+            hash_indexes[folder] = HashIndex(folder)
+        tiles = texture.tiles or [texture.path]
+        try:
+            hashes = [hash_indexes[folder].get(tile) for tile in tiles]
+        except (IOError, OSError) as error:
+            sys.stderr.write("Can't read {0}: {1}\n".format(texture.path, error))
+            planned.append((texture, None))
+            continue
+        set_hash = hashes[0] if len(hashes) == 1 else hashlib.md5("".join(hashes).encode("ascii")).hexdigest()
+        outputs = [os.path.join(folder, outputName(texture, tile, set_hash, converter)) for tile in tiles]
+        for tile, output in zip(tiles, outputs):
+            if not os.path.exists(output):
+                jobs[output] = (tile, output, converter)
+        planned.append((texture, outputs))
+    for folder, hash_index in hash_indexes.items():
+        hash_index.save()
+
+    failed = set()
+    if jobs and not run:
+        failed.update(jobs)
+    elif jobs:
+        # the conversions are separate processes, the threads only start and wait for them
+        pool = ThreadPool(workers)
+        try:
+            for (source, output, converter), error in zip(jobs.values(), pool.map(runConverter, list(jobs.values()))):
+                if error:
+                    sys.stderr.write("Can't convert {0}: {1}\n".format(source, error))
+                    failed.add(output)
+        finally:
+            pool.close()
+            pool.join()
+
+    converted = []
+    for texture, outputs in planned:
+        if outputs is None or failed.intersection(outputs):
+            converted.append(texture)
+        else:
+            converted.append(Texture(texture.name, outputs[0], texture.material, texture.map_type, texture.resolution,
+                                     outputs if texture.tiles else ()))
+    return converted
+
+
+def convertIndex(texture_index, converter, workers=None, run=True):
+    # texture_index (material -> {map_type: Texture}) with the textures swapped for their converted files
+    textures = [texture for maps in texture_index.values() for texture in maps.values()]
+    converted = iter(convertTextures(textures, converter, workers, run))
+    for maps in texture_index.values():
+        for map_type in maps:
+            maps[map_type] = next(converted)
+    return texture_index
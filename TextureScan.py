@@ -0,0 +1,244 @@
+# Discovery of texture maps exported from substance.
+#
+# A folder is read in a single pass and turned into an index of
+# material -> {map_type -> Texture}, so the importers never have to rescan the
+# list of textures per material. crawlTextureIndexes does the same for a whole
+# tree of export folders, listing subfolders concurrently.
+
+import os
+import re
+import collections
+import fnmatch
+from multiprocessing.pool import ThreadPool
+
+try:
+    from os import scandir
+except ImportError:
+    # Python 2 (Maya 2020 and older) has no os.scandir
+    scandir = None
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+texture_extensions = (".exr", ".jpg", ".png")
+
+# <material>_<map_type>[_<resolution>][.<udim>].<ext>, like wood_basecolor.exr, wood_basecolor_2k.exr,
+# wood_basecolor_2048.exr or wood_basecolor.1001.exr. The map type starts with a letter, so "_2k" is
+# never taken for one. UDIM tiles only come after a "." (Mari), "_1024" is a size in pixels.
+texture_name_pattern = re.compile(r"^(?P<material>.+)_(?P<map_type>[A-Za-z][^_.]*)"
+                                  r"(?:_(?P<resolution>\d+[kK]|\d{3,5}))?(?:\.(?P<udim>1\d{3}))?$")
+
+
+class Texture(object):
+    # path is the first tile of a UDIM texture set, tiles holds the paths of all its tiles
+    __slots__ = ("name", "path", "material", "map_type", "resolution", "tiles")
+
+    def __init__(self, name, path, material, map_type, resolution="", tiles=()):
+        self.name = name
+        self.path = path
+        self.material = material
+        self.map_type = map_type
+        self.resolution = resolution
+        self.tiles = list(tiles)
+
+    def __repr__(self):
+        return "Texture({0!r}, {1!r})".format(self.name, self.path)
+
+
+def parseTextureName(folder, filename, pattern=texture_name_pattern):
+    # Returns a Texture for a file matching pattern, or None for anything that doesn't look like a map.
+    # The tile number of a UDIM tile is put in tiles, parseTextures groups the tiles into one texture.
+    name, extension = os.path.splitext(filename)
+    match = pattern.match(name)
+    if match is None or extension.lower() not in texture_extensions:
+        return None
+    material, map_type = match.group("material"), match.group("map_type")
+    resolution, udim = (match.group("resolution") or "").lower(), match.group("udim")
+    return Texture(material + "_" + map_type, os.path.join(folder, filename), material, map_type, resolution, [udim] if udim else ())
+
+
+def textureSetSignature(texture):
+    # textureSignature of every tile of a UDIM set, or of the texture itself
+    return ",".join(textureSignature(path) for path in (texture.tiles or [texture.path]))
+
+
+def resolutionPixels(resolution):
+    # "2k" and "2048" are the same tier
+    return int(resolution[:-1]) * 1024 if resolution[-1:].lower() == "k" else int(resolution)
+
+
+def resolutionRank(resolution, preferred):
+    # Sort key for the resolution variants of a map, the lowest is used. Without a preference the
+    # unlabelled export wins, then the highest resolution. With one, the preferred tier wins, then the
+    # next lower tiers, the unlabelled export and only then higher tiers, the smallest first.
+    if not resolution:
+        return (1, 0)
+    size = resolutionPixels(resolution)
+    if not preferred:
+        return (2, -size)
+    preferred_size = resolutionPixels(preferred)
+    if size == preferred_size:
+        return (0, 0)
+    if size < preferred_size:
+        return (0, preferred_size - size)
+    return (3, size)
+
+
+def textureSignature(path):
+    # size and modification time of a texture, cheap enough to notice maps that were overwritten in place
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    return "{0}:{1}".format(stat.st_size, int(stat.st_mtime))
+
+
+def listDirectory(search_path):
+    # sorted names of the files and of the folders in search_path, skipping hidden entries like .DS_Store or ._<name>
+    files, folders = [], []
+    if scandir is not None:
+        for entry in scandir(search_path):
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                folders.append(entry.name)
+            elif entry.is_file():
+                files.append(entry.name)
+    else:
+        for filename in os.listdir(search_path):
+            if filename.startswith("."):
+                continue
+            if os.path.isdir(os.path.join(search_path, filename)):
+                folders.append(filename)
+            else:
+                files.append(filename)
+    return sorted(files), sorted(folders)
+
+
+def listFiles(search_path):
+    return listDirectory(search_path)[0]
+
+
+def parseTextures(search_path, filenames):
+    # Parses filenames (sorted) into Textures, the tiles of a UDIM set become one Texture
+    textures = []
+    udim_sets = {}
+    for filename in filenames:
+        texture = parseTextureName(search_path, filename)
+        if texture is None:
+            continue
+        if not texture.tiles:
+            textures.append(texture)
+            continue
+        key = (texture.name, texture.resolution, os.path.splitext(filename)[1].lower())
+        udim_set = udim_sets.get(key)
+        if udim_set is None:
+            udim_set = udim_sets[key] = texture
+            textures.append(texture)
+        udim_set.tiles.append((texture.tiles.pop(), texture.path))
+    for udim_set in udim_sets.values():
+        udim_set.tiles = [path for udim, path in sorted(udim_set.tiles)]
+        udim_set.path = udim_set.tiles[0]
+    return textures
+
+
+def buildIndex(textures, map_types, resolution=None):
+    # Picks one texture per material and map type: the best resolution tier (see resolutionRank),
+    # then the first in textures, which for sorted filenames makes .exr win over .jpg and .png.
+    # map_types is a list of map types, or a dict of lower case names -> map type to also accept
+    # aliases (ShaderRules.names). Map types are matched case insensitive.
+    if not isinstance(map_types, dict):
+        map_types = dict((map_type.lower(), map_type) for map_type in map_types)
+    index = {}
+    for order, texture in enumerate(textures):
+        map_type = map_types.get(texture.map_type.lower())
+        if map_type is None:
+            continue
+        rank = resolutionRank(texture.resolution, resolution) + (order,)
+        maps = index.setdefault(texture.material, {})
+        if map_type not in maps or rank < maps[map_type][0]:
+            maps[map_type] = (rank, texture)
+    return collections.OrderedDict((material, dict((map_type, texture) for map_type, (rank, texture) in maps.items()))
+                                   for material, maps in sorted(index.items()))
+
+
+def indexFiles(search_path, filenames, map_types, resolution=None):
+    return buildIndex(parseTextures(search_path, filenames), map_types, resolution)
+
+
+def indexTextures(search_path, map_types, cache=None, resolution=None):
+    # Returns an OrderedDict of material name -> {map_type: Texture}, sorted by material name.
+    # When a map is exported in more than one format .exr wins over .jpg and .jpg over .png.
+    # resolution ("1k", "4k", ...) picks the resolution variant, see resolutionRank.
+    # With a ScanCache the folder is only listed again when it changed since the last scan.
+    records = cache.get("textures", search_path) if cache is not None else None
+    if records is None:
+        textures = parseTextures(search_path, listFiles(search_path))
+        if cache is not None:
+            cache.put("textures", search_path, [[t.name, os.path.basename(t.path), t.material, t.map_type, t.resolution,
+                                                 [os.path.basename(tile) for tile in t.tiles]] for t in textures])
+    else:
+        textures = [Texture(name, os.path.join(search_path, filename), material, map_type, resolution_tier,
+                            [os.path.join(search_path, tile) for tile in tiles])
+                    for name, filename, material, map_type, resolution_tier, tiles in records]
+    return buildIndex(textures, map_types, resolution)
+
+
+def matchesPatterns(relative_path, include=None, exclude=None):
+    # include/exclude are lists of glob patterns matched against the "/" separated path relative to the crawl root
+    if exclude and any(fnmatch.fnmatch(relative_path, pattern) for pattern in exclude):
+        return False
+    if include and not any(fnmatch.fnmatch(relative_path, pattern) for pattern in include):
+        return False
+    return True
+
+
+def crawlTextureIndexes(root, map_types, max_depth=None, include=None, exclude=None, workers=8, resolution=None):
+    # Generator yielding (folder, index) for every folder below root that contains textures, in the
+    # order the folders finish listing. Folders are listed by a pool of threads, so on high latency
+    # network shares many directory reads are in flight at once. max_depth 0 only reads root itself.
+    # Include patterns select files, exclude patterns also prune whole folders.
+    results = queue.Queue()
+    # the root is listed right away, so a wrong path raises here like os.listdir would, before
+    # there is a pool to clean up
+    results.put((root, "", 0) + listDirectory(root))
+    pending = 1
+    pool = ThreadPool(workers)
+
+    def listFolder(folder, relative_folder, depth):
+        files, folders = [], []
+        try:
+            files, folders = listDirectory(folder)
+        except OSError:
+            # unreadable subfolders are skipped instead of stopping the whole crawl
+            pass
+        finally:
+            results.put((folder, relative_folder, depth, files, folders))
+
+    try:
+        while pending:
+            folder, relative_folder, depth, files, folders = results.get()
+            pending -= 1
+            if max_depth is None or depth < max_depth:
+                for name in folders:
+                    relative_path = relative_folder + name
+                    if exclude and not matchesPatterns(relative_path, exclude=exclude):
+                        continue
+                    pending += 1
+                    pool.apply_async(listFolder, (os.path.join(folder, name), relative_path + "/", depth + 1))
+            files = [name for name in files if matchesPatterns(relative_folder + name, include, exclude)]
+            index = indexFiles(folder, files, map_types, resolution)
+            if index:
+                yield folder, index
+    finally:
+        pool.terminate()
+
+
+def crawlTextures(root, map_types, **crawl_options):
+    # Same as crawlTextureIndexes, but yields the Texture records one by one
+    for folder, index in crawlTextureIndexes(root, map_types, **crawl_options):
+        for textures in index.values():
+            for map_type in sorted(textures):
+                yield textures[map_type]
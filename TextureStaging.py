@@ -0,0 +1,150 @@
+# Copies textures into a project, for example the multi-GB EXR light rigs of the ShaderBall scene.
+#
+# Files are copied by a pool of threads in chunks, into a temporary file next to the destination
+# that is renamed into place when it is complete, so an interrupted copy never leaves a partly
+# written texture behind. A destination is only skipped when it is really current: same size and
+# modification time as the source ("stat"), or the same content ("hash", slower but exact).
+
+import os
+import errno
+import shutil
+import hashlib
+import tempfile
+import threading
+from multiprocessing.pool import ThreadPool
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from ScanCache import replaceFile
+
+chunk_size = 4 * 1024 * 1024
+verify_modes = ("stat", "hash")
+
+
+class Cancelled(Exception):
+    pass
+
+
+class StagingResult(object):
+    __slots__ = ("copied", "current", "failed", "cancelled")
+
+    def __init__(self):
+        self.copied = []     # destination paths that were written
+        self.current = []    # destination paths that were already up to date
+        self.failed = []     # [(source, error message)]
+        self.cancelled = False
+
+
+def fileHash(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def isCurrent(source, destination, verify="stat"):
+    # True when destination already holds the same file as source
+    try:
+        destination_stat = os.stat(destination)
+    except OSError:
+        return False
+    source_stat = os.stat(source)
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    if verify == "hash":
+        return fileHash(source) == fileHash(destination)
+    # copyFile gives the destination the modification time of the source, file systems that
+    # round timestamps (FAT, some network shares) get two seconds of slack
+    return abs(source_stat.st_mtime - destination_stat.st_mtime) < 2
+
+
+def copyFile(source, destination, cancel_event=None, progress=None):
+    # Copies source in chunks to a temporary file in the destination folder and renames it into place.
+    # progress is called with the number of bytes of every chunk written.
+    folder = os.path.dirname(destination)
+    try:
+        os.makedirs(folder)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+    handle, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(destination) + ".", suffix=".part", dir=folder)
+    try:
+        with open(source, "rb") as source_file, os.fdopen(handle, "wb") as temp_file:
+            for chunk in iter(lambda: source_file.read(chunk_size), b""):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise Cancelled()
+                temp_file.write(chunk)
+                if progress:
+                    progress(len(chunk))
+        shutil.copystat(source, temp_path)
+        replaceFile(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def stageFiles(pairs, workers=4, verify="stat", progress=None):
+    # Copies [(source, destination)] with a pool of threads and returns a StagingResult.
+    # progress(bytes done, bytes total) is called from the calling thread, so it may update the
+    # Maya UI. It returns False to cancel, files that were being copied are then cleaned up.
+    if verify not in verify_modes:
+        raise ValueError("verify must be one of {0}".format(", ".join(verify_modes)))
+    result = StagingResult()
+    jobs = []
+    for source, destination in pairs:
+        try:
+            jobs.append((source, destination, os.path.getsize(source)))
+        except OSError as error:
+            # one missing texture shouldn't keep the others from being staged
+            result.failed.append((source, str(error)))
+    total_bytes = sum(size for source, destination, size in jobs)
+
+    events = queue.Queue()
+    cancel_event = threading.Event()
+
+    def stageFile(job):
+        source, destination, size = job
+        try:
+            if cancel_event.is_set():
+                raise Cancelled()
+            if isCurrent(source, destination, verify):
+                events.put(("current", job, size))
+            else:
+                copyFile(source, destination, cancel_event, lambda written: events.put(("bytes", job, written)))
+                events.put(("copied", job, None))
+        except Cancelled:
+            events.put(("cancelled", job, None))
+        except (IOError, OSError) as error:
+            events.put(("failed", job, str(error)))
+
+    pool = ThreadPool(workers)
+    try:
+        for job in jobs:
+            pool.apply_async(stageFile, (job,))
+        done_bytes = 0
+        pending = len(jobs)
+        while pending:
+            event, job, value = events.get()
+            if event == "bytes":
+                done_bytes += value
+            else:
+                pending -= 1
+                if event == "current":
+                    done_bytes += value
+                    result.current.append(job[1])
+                elif event == "copied":
+                    result.copied.append(job[1])
+                elif event == "failed":
+                    result.failed.append((job[0], value))
+            if progress and progress(done_bytes, total_bytes) is False and not cancel_event.is_set():
+                cancel_event.set()
+                result.cancelled = True
+    finally:
+        pool.close()
+        pool.join()
+    return result
@@ -0,0 +1,213 @@
+# Thumbnails and contact sheets of substance material libraries, without rendering:
+#
+#   python Thumbnails.py D:/libraries/wood D:/libraries/metal -o D:/thumbnails --size 256 --columns 10
+#
+# Every material gets <output>/<library>/<material>.jpg, its basecolor with the roughness map in the
+# lower right half, and the thumbnails of a library are laid out on contact sheets of columns x rows.
+# <library> is the folder name with a hash of its path, see libraryFolderName.
+# JPEGs are decoded at reduced size, the maps are combined with numpy and all thumbnails are made
+# by a pool of processes. The input signatures of every thumbnail are kept in thumbnails.json in
+# the output folder, so running it again only makes thumbnails for new or changed maps.
+# Needs Pillow and numpy, which are not part of Maya's Python. OpenEXR maps are skipped, Pillow
+# can't read them.
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+import multiprocessing
+
+try:
+    import numpy
+    from PIL import Image, ImageDraw
+except ImportError:
+    numpy = Image = ImageDraw = None
+
+from TextureScan import indexTextures, crawlTextureIndexes, textureSignature
+from ScanCache import getScanCache, replaceFile, removeFile, saveJson
+
+thumbnail_maps = ["basecolor", "roughness"]
+thumbnail_extensions = (".jpg", ".png")
+cache_name = "thumbnails.json"
+cache_version = 1
+
+
+def requireImaging():
+    if Image is None:
+        raise ImportError("Thumbnails needs Pillow and numpy, install them for the Python that runs this tool")
+
+
+def loadMap(path, size, mode):
+    # Decodes path as a size x size array. JPEGs are decoded at the nearest smaller scale right away,
+    # so a 8k map never has to be held in memory at full size.
+    image = Image.open(path)
+    image.draft(mode, (size, size))
+    image = image.convert(mode).resize((size, size), Image.BILINEAR)
+    return numpy.asarray(image, dtype=numpy.uint8)
+
+
+def makeThumbnail(job):
+    # Writes one thumbnail, returns (material, thumbnail path, error message or None). Runs in a worker process.
+    material, basecolor, roughness, thumbnail_path, size = job
+    try:
+        tile = loadMap(basecolor, size, "RGB") if basecolor else numpy.full((size, size, 3), 128, numpy.uint8)
+        if roughness:
+            # the lower right triangle shows the roughness map as gray
+            rows, columns = numpy.indices((size, size))
+            mask = rows + columns >= size
+            tile = tile.copy()
+            tile[mask] = loadMap(roughness, size, "L")[mask][:, None]
+        handle, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(thumbnail_path) + ".", suffix=".tmp", dir=os.path.dirname(thumbnail_path))
+        os.close(handle)
+        try:
+            Image.fromarray(tile).save(temp_path, "JPEG", quality=85)
+            replaceFile(temp_path, thumbnail_path)
+        finally:
+            removeFile(temp_path)
+        return material, thumbnail_path, None
+    except (IOError, OSError, ValueError) as error:
+        return material, thumbnail_path, str(error)
+
+
+def thumbnailInputs(textures):
+    # (basecolor path, roughness path) of a material, None for maps that are missing or can't be read
+    paths = []
+    for map_type in thumbnail_maps:
+        texture = textures.get(map_type)
+        valid = texture is not None and texture.path.lower().endswith(thumbnail_extensions)
+        paths.append(texture.path if valid else None)
+    return tuple(paths)
+
+
+def loadCache(output):
+    try:
+        with open(os.path.join(output, cache_name), "r") as json_file:
+            data = json.load(json_file)
+        if data.get("version") == cache_version:
+            return data["thumbnails"]
+    except (IOError, OSError, ValueError, KeyError):
+        pass
+    return {}
+
+
+def saveCache(output, thumbnails):
+    # a cache that can't be written only means the thumbnails are made again next time
+    saveJson(os.path.join(output, cache_name), {"version": cache_version, "thumbnails": thumbnails})
+
+
+def libraryFolderName(folder):
+    # <folder name>_<hash of its path>: libraries with the same name don't share an output folder, also
+    # not when BatchDriver workers make them, and a library gets the same folder again on the next run
+    path = os.path.normcase(os.path.abspath(folder))
+    return "{0}_{1}".format(os.path.basename(os.path.normpath(folder)), hashlib.md5(path.encode("utf-8")).hexdigest()[:8])
+
+
+def processPool(processes=None):
+    # inside the Maya GUI sys.executable is maya(.exe) itself, the workers have to be started with mayapy
+    executable = os.path.basename(sys.executable).lower()
+    if executable.startswith("maya") and not executable.startswith("mayapy"):
+        multiprocessing.set_executable(os.path.join(os.path.dirname(sys.executable), "mayapy" + os.path.splitext(executable)[1]))
+    return multiprocessing.Pool(processes)
+
+
+def makeThumbnails(texture_index, output, size=256, processes=None):
+    # Returns material -> thumbnail path for the materials of texture_index (as made by indexTextures).
+    # Thumbnails whose maps and size didn't change since the last run are not made again.
+    requireImaging()
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    cache = loadCache(output)
+    thumbnails, jobs = {}, []
+    for material, textures in texture_index.items():
+        basecolor, roughness = thumbnailInputs(textures)
+        if basecolor is None and roughness is None:
+            continue
+        thumbnail_path = os.path.join(output, material + ".jpg")
+        key = [textureSignature(basecolor) if basecolor else "", textureSignature(roughness) if roughness else "", size]
+        if cache.get(material) == key and os.path.exists(thumbnail_path):
+            thumbnails[material] = thumbnail_path
+        else:
+            cache.pop(material, None)
+            jobs.append(((material, basecolor, roughness, thumbnail_path, size), key))
+
+    if jobs:
+        keys = dict((job[0], key) for job, key in jobs)
+        pool = processPool(processes)
+        try:
+            for material, thumbnail_path, error in pool.imap_unordered(makeThumbnail, [job for job, key in jobs]):
+                if error:
+                    sys.stderr.write("No thumbnail for {0}: {1}\n".format(material, error))
+                    continue
+                thumbnails[material] = thumbnail_path
+                cache[material] = keys[material]
+        finally:
+            pool.close()
+            pool.join()
+        saveCache(output, cache)
+    return thumbnails
+
+
+def makeContactSheets(thumbnails, output, name="contact", columns=10, rows=10, size=128):
+    # Lays the thumbnails out by material name on <output>/<name>_<page>.jpg, columns x rows per sheet.
+    # Only one sheet is in memory at a time. Returns the sheet paths.
+    requireImaging()
+    label_height = 14
+    materials = sorted(thumbnails)
+    per_sheet = columns * rows
+    sheets = []
+    for page, start in enumerate(range(0, len(materials), per_sheet)):
+        page_materials = materials[start:start + per_sheet]
+        used_rows = (len(page_materials) + columns - 1) // columns
+        sheet = Image.new("RGB", (columns * size, used_rows * (size + label_height)), (40, 40, 40))
+        draw = ImageDraw.Draw(sheet)
+        for i, material in enumerate(page_materials):
+            x, y = (i % columns) * size, (i // columns) * (size + label_height)
+            with Image.open(thumbnails[material]) as thumbnail:
+                thumbnail.draft("RGB", (size, size))
+                sheet.paste(thumbnail.convert("RGB").resize((size, size), Image.BILINEAR), (x, y))
+            draw.text((x + 2, y + size + 1), material[:size // 6], fill=(220, 220, 220))
+        sheet_path = os.path.join(output, "{0}_{1:03d}.jpg".format(name, page + 1))
+        sheet.save(sheet_path, "JPEG", quality=85)
+        sheets.append(sheet_path)
+    return sheets
+
+
+def makeLibraryThumbnails(folder, output, size=256, columns=10, rows=10, processes=None, use_cache=True, recursive=False):
+    # Thumbnails and contact sheets of the substance exports in folder, returns the sheet paths. With
+    # recursive every subfolder with maps gets its own thumbnails and sheets, in the same subfolder of output.
+    if recursive:
+        libraries = crawlTextureIndexes(folder, thumbnail_maps)
+    else:
+        libraries = [(folder, indexTextures(folder, thumbnail_maps, getScanCache() if use_cache else None))]
+    sheets = []
+    for library, texture_index in libraries:
+        library_output = os.path.normpath(os.path.join(output, os.path.relpath(library, folder)))
+        thumbnails = makeThumbnails(texture_index, library_output, size, processes)
+        sheets.extend(makeContactSheets(thumbnails, library_output, os.path.basename(os.path.normpath(library)),
+                                        columns, rows, min(size, 128)))
+    return sheets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make thumbnails and contact sheets of substance material libraries.")
+    parser.add_argument("folders", nargs="+", help="folders with texture maps")
+    parser.add_argument("-o", "--output", required=True, help="folder to write the thumbnails and contact sheets to")
+    parser.add_argument("--size", type=int, default=256, help="thumbnail size in pixels (default: 256)")
+    parser.add_argument("--columns", type=int, default=10, help="thumbnails per row on a contact sheet (default: 10)")
+    parser.add_argument("--rows", type=int, default=10, help="rows per contact sheet (default: 10)")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per cpu)")
+    parser.add_argument("--recursive", action="store_true", help="also make thumbnails for the subfolders, each in its own output subfolder")
+    options = parser.parse_args(argv)
+
+    for folder in options.folders:
+        output = os.path.join(options.output, libraryFolderName(folder))
+        for sheet in makeLibraryThumbnails(folder, output, options.size, options.columns, options.rows, options.processes,
+                                           recursive=options.recursive):
+            print(sheet)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# Stand-in for the Maya, PyMEL and PySide2 modules the tools import, so they can be benchmarked
+# on a machine without Maya. pymel.core counts every call and creates lightweight fake nodes.
+
+import re
+import sys
+import types
+import collections
+
+
+class FakeAttribute(object):
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    def __str__(self):
+        return "{0}.{1}".format(self.node, self.name)
+
+    def get(self):
+        return None
+
+
+class FakeNode(object):
+    def __init__(self, name, node_type):
+        self._name = name
+        self.node_type = node_type
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return FakeAttribute(self, name)
+
+    def __str__(self):
+        return self._name
+
+    def __add__(self, other):
+        return self._name + other
+
+    def nodeName(self):
+        return self._name
+
+    def type(self):
+        return self.node_type
+
+    def attr(self, name):
+        return FakeAttribute(self, name)
+
+    def hasAttr(self, name):
+        return False
+
+
+class FakeMel(object):
+    # pymel.core.mel: every eval is one call, the nodes created by a ScenePlan creation script are
+    # added to the node table and their names returned like Maya does
+    creation = re.compile(r'^\s*\$created\[\d+\] = `(shadingNode|sets) (.*)`;$', re.M)
+    quoted = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+    def __init__(self, pm):
+        self.pm = pm
+
+    def eval(self, script):
+        self.pm.calls["mel.eval"] += 1
+        names = []
+        for command, arguments in self.creation.findall(script):
+            name = re.search(r'-name "((?:[^"\\]|\\.)*)"', arguments).group(1)
+            node_type = self.quoted.findall(arguments)[-1] if command == "shadingNode" else "shadingEngine"
+            node = FakeNode(self.pm.uniqueName(name), node_type)
+            self.pm.nodes[node._name] = node
+            names.append(node._name)
+        return names
+
+
+class FakePyMEL(types.ModuleType):
+    # pymel.core: every function is counted, node creating ones keep a name table like Maya does
+    def __init__(self):
+        types.ModuleType.__init__(self, "pymel.core")
+        self.calls = collections.Counter()
+        self.nodes = {}
+        self.mel = FakeMel(self)
+
+    def reset(self):
+        self.calls.clear()
+        self.nodes.clear()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def command(*args, **kwargs):
+            self.calls[name] += 1
+            return None
+        return command
+
+    def uniqueName(self, name):
+        # Maya appends a number to names that are taken
+        if name not in self.nodes:
+            return name
+        base = name.rstrip("0123456789")
+        number = 1
+        while base + str(number) in self.nodes:
+            number += 1
+        return base + str(number)
+
+    def shadingNode(self, node_type, name=None, **flags):
+        self.calls["shadingNode"] += 1
+        node = FakeNode(self.uniqueName(name or node_type), node_type)
+        self.nodes[node._name] = node
+        return node
+
+    def sets(self, *args, **flags):
+        # only creating empty shading groups makes a node, adding members is just counted
+        self.calls["sets"] += 1
+        if args:
+            return None
+        node = FakeNode(self.uniqueName(flags.get("name") or "set"), "shadingEngine")
+        self.nodes[node._name] = node
+        return node
+
+    def PyNode(self, name):
+        self.calls["PyNode"] += 1
+        return self.nodes.get(str(name)) or FakeNode(str(name), "unknown")
+
+    def ls(self, *args, **kwargs):
+        self.calls["ls"] += 1
+        return []
+
+    def listConnections(self, *args, **kwargs):
+        self.calls["listConnections"] += 1
+        return []
+
+
+class FakeCmds(types.ModuleType):
+    # maya.cmds: scene queries answer from the node table of the fake pymel.core
+    def __init__(self, pm):
+        types.ModuleType.__init__(self, "maya.cmds")
+        self.pm = pm
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.pm, name)
+
+    def ls(self, *args, **kwargs):
+        self.pm.calls["ls"] += 1
+        return list(self.pm.nodes)
+
+    def objExists(self, name):
+        self.pm.calls["objExists"] += 1
+        return name in self.pm.nodes
+
+    def listRelatives(self, *args, **kwargs):
+        self.pm.calls["listRelatives"] += 1
+        return []
+
+
+class FakeType(type):
+    # dummy classes, their class attributes (like QtCore.Qt.DisplayRole) are dummy classes as well
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return fakeClass(name)
+
+
+def fakeAttribute(self, name):
+    # the attributes of dummy instances (like renderSetup.instance().decode) too
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return fakeClass(name)
+
+
+def fakeClass(name):
+    return FakeType(name, (object,), {"__init__": lambda self, *args, **kwargs: None, "__getattr__": fakeAttribute})
+
+
+class FakeModule(types.ModuleType):
+    # any other module: attributes are dummy classes or functions
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return fakeClass(name)
+
+
+fake_module_names = [
+    "maya", "maya.OpenMaya", "maya.OpenMayaUI", "maya.standalone",
+    "maya.app", "maya.app.renderSetup", "maya.app.renderSetup.model",
+    "maya.app.renderSetup.model.renderLayer", "maya.app.renderSetup.model.renderSetup",
+    "PySide2", "PySide2.QtWidgets", "PySide2.QtGui", "PySide2.QtCore", "shiboken2"]
+
+
+def install():
+    # puts the stand-ins in sys.modules and returns the fake pymel.core
+    pm = FakePyMEL()
+    modules = {"pymel": FakeModule("pymel"), "pymel.core": pm, "maya.cmds": FakeCmds(pm)}
+    for name in fake_module_names:
+        modules[name] = FakeModule(name)
+    for name, module in modules.items():
+        sys.modules[name] = module
+        if "." in name:
+            parent, child = name.rsplit(".", 1)
+            setattr(modules[parent], child, module)
+    return pm
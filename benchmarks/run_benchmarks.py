@@ -0,0 +1,230 @@
+# Scaling benchmark for the importers, runs on any machine with plain Python (no Maya needed):
+#
+#   python benchmarks/run_benchmarks.py --sizes 10 100 1000 10000 100000 --output results.csv
+#
+# For every size a synthetic library is generated (substance exports with all map types, AxF files
+# and a BOM text for ImportMUS), then each function is timed against the fake pymel.core from
+# fake_maya.py. The csv has one row per function and size with the best time of --repeat runs,
+# the throughput in inputs per second and the number of pymel calls, so scaling regressions show
+# up as curves that bend. Before that it checks that importing the tools, which is all the Launcher
+# does before showing a dialog, neither imports pymel nor calls into Maya, that the planning modules
+# import without Maya at all and that plans survive the trip through a manifest.
+
+import argparse
+import collections
+import csv
+import os
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+benchmark_folder = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmark_folder))
+sys.path.insert(0, benchmark_folder)
+
+import fake_maya
+
+pm = fake_maya.install()
+# keep the tools from writing reports into the home folder
+os.environ["PRODUCT_REPLACEMENT_REPORTS"] = "off"
+
+import_start = time.time()
+import ImportSubstanceTextures
+import Import_AxF
+import Import_MUS
+import MaterialLinker
+import ShaderBall_Scene
+import Launcher
+import_seconds = time.time() - import_start
+
+import LazyModule
+import ScenePlan
+import SubstancePlan
+import AxFPlan
+import MUSPlan
+
+tool_modules = [ImportSubstanceTextures, Import_AxF, Import_MUS, MaterialLinker, ShaderBall_Scene]
+
+
+def checkStartup():
+    # the lazy modules of the tools must still be unused, and no plugin loaded, after importing them
+    for module in tool_modules:
+        for name in ("pm", "renderSetup", "renderLayer"):
+            if hasattr(module, name) and LazyModule.isLoaded(getattr(module, name)):
+                raise AssertionError("importing {0} imports {1}".format(module.__name__, name))
+    if pm.calls:
+        raise AssertionError("importing the tools calls pymel: {0}".format(", ".join(sorted(pm.calls))))
+    print("tools imported in {0:.4f} seconds without pymel".format(import_seconds))
+
+
+def checkMayaFree():
+    # PlanManifest.py has to run where there is no Maya, so the planning must not import any of it
+    script = ("import sys; import PlanManifest, SubstancePlan, AxFPlan, MUSPlan; "
+              "print(' '.join(name for name in sys.modules if name.split('.')[0] in ('maya', 'pymel', 'PySide2', 'shiboken2')))")
+    output = subprocess.check_output([sys.executable, "-c", script], cwd=os.path.dirname(benchmark_folder))
+    if output.strip():
+        raise AssertionError("the planning modules import {0}".format(output.decode().strip()))
+
+
+def checkManifest(plans, folder):
+    # a manifest must give back the same plans, with the same hash, and build the same nodes
+    path = os.path.join(folder, "manifest.json")
+    ScenePlan.writeManifest(path, plans)
+    if ScenePlan.writeManifest(path, plans):
+        raise AssertionError("an unchanged manifest was written again")
+    manifest = ScenePlan.readManifest(path)
+    if [plan.toDict() for plan in manifest["plans"]] != [plan.toDict() for plan in plans] or \
+            manifest["hash"] != ScenePlan.manifestHash(manifest["plans"]):
+        raise AssertionError("the plans changed on the way through the manifest")
+    calls = []
+    for plan_list in (plans, manifest["plans"]):
+        pm.reset()
+        for plan in plan_list:
+            ScenePlan.applyPlan(plan, pm)
+        calls.append(dict(pm.calls))
+    if calls[0] != calls[1]:
+        raise AssertionError("the plans from the manifest issue other pymel calls")
+
+
+def planAll(substance_folder, axf_folder, part_list):
+    plans = SubstancePlan.planLibrary(substance_folder, use_cache=False)
+    axf_plan = AxFPlan.planMaterials(axf_folder, use_cache=False)
+    plans.append(axf_plan)
+    plans.append(AxFPlan.planRenderSettings(AxFPlan.planRenderLayers(ScenePlan.ScenePlan(), [name for key, node_type, name, flags in axf_plan.nodes])))
+    plans.append(MUSPlan.plan_blend_materials(cleanupInput(part_list), set()))
+    return plans
+
+
+def writeAndApplyManifest(plans, path):
+    ScenePlan.writeManifest(path, plans)
+    for plan in ScenePlan.readManifest(path)["plans"]:
+        ScenePlan.applyPlan(plan, pm)
+
+
+def createLibrary(folder, size):
+    # size substance texture files (size / 10 materials with every map type) and size AxF files
+    substance_folder = os.path.join(folder, "substance")
+    axf_folder = os.path.join(folder, "axf")
+    os.makedirs(substance_folder)
+    os.makedirs(axf_folder)
+    material_count = max(1, size // len(ImportSubstanceTextures.map_types))
+    for i in range(material_count):
+        for map_type in ImportSubstanceTextures.map_types:
+            open(os.path.join(substance_folder, "material{0:06d}_{1}.png".format(i, map_type)), "w").close()
+    for i in range(size):
+        open(os.path.join(axf_folder, "swatch{0:06d}.axf".format(i)), "w").close()
+    return substance_folder, axf_folder
+
+
+def createPartList(size, seed=0):
+    # BOM text as it gets pasted: numbered lines, spaces, commas and the odd illegal character
+    generator = random.Random(seed)
+    lines = []
+    for i in range(size):
+        name = "{0} part {1}{2}".format(i, generator.choice(["frame", "Bolt", "cover plate", "glass"]), generator.choice(["", "#", " (2)", "&"]))
+        lines.append(name if i % 3 else name + ", spare " + str(i))
+    return "\n".join(lines)
+
+
+def cleanupInput(text):
+    # cleanup_input is a method of the dialog, but doesn't use the instance
+    method = Import_MUS.ImportMUS.cleanup_input
+    return getattr(method, "__func__", method)(None, text)
+
+
+def legacyCleanupInput(text_input):
+    # the loop of ImportMUS.cleanup_input before it used iter_part_names, to compare against. Not the
+    # old method as it was: that raised an IndexError on lines with only digits, _ and -, and returned
+    # None instead of [] when nothing was left. Both are fixed here, the names are the same.
+    alpha_numeric = (string.ascii_letters + string.digits + "_-,")
+    comma_separated = text_input.replace(" ", "_").split(",")
+    clean_input = []
+    for t in comma_separated:
+        for line in [s for s in t.splitlines() if s]:
+            illegal_chars_removed = "".join([c for c in line if c in alpha_numeric])
+            while illegal_chars_removed and illegal_chars_removed[0] in (string.digits + "_-"):
+                illegal_chars_removed = illegal_chars_removed[1:]
+            if illegal_chars_removed != "":
+                clean_input.append(illegal_chars_removed)
+    return clean_input
+
+
+def checkCleanupInput(part_list, seed=0):
+    # the new sanitizer must give the legacy names minus duplicates, also on random garbage
+    generator = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + " _-,.#&()\t\r\n"
+    texts = [part_list] + ["".join(generator.choice(alphabet) for _ in range(generator.randint(0, 200))) for _ in range(200)]
+    for text in texts:
+        expected = list(collections.OrderedDict.fromkeys(legacyCleanupInput(text)))
+        if cleanupInput(text) != expected:
+            raise AssertionError("cleanup_input differs from the legacy version for {0!r}".format(text[:200]))
+
+
+def benchmarks(substance_folder, axf_folder, part_list, texture_dicts, manifest_path):
+    # name, function to time
+    return [
+        ("planLibrary", lambda: SubstancePlan.planLibrary(substance_folder, use_cache=False)),
+        ("plan, write and apply manifest", lambda: writeAndApplyManifest(planAll(substance_folder, axf_folder, part_list), manifest_path)),
+        ("getTextureDicts", lambda: ImportSubstanceTextures.getTextureDicts(substance_folder, use_cache=False)),
+        ("getMaterialNames", lambda: ImportSubstanceTextures.getMaterialNames(texture_dicts)),
+        ("SetupMaterials", lambda: ImportSubstanceTextures.SetupMaterials(substance_folder, use_cache=False)),
+        ("ImportMUS.cleanup_input", lambda: cleanupInput(part_list)),
+        ("legacy cleanup_input", lambda: legacyCleanupInput(part_list)),
+        ("create_blend_materials", lambda: Import_MUS.create_blend_materials(cleanupInput(part_list), link_geo=True)),
+        ("AxFImporter.makeMaterials", lambda: Import_AxF.makeMaterials(axf_folder, use_cache=False)),
+    ]
+
+
+def timeFunction(function, repeat):
+    # best wall time of repeat runs and the pymel calls of one run
+    best = None
+    for _ in range(repeat):
+        pm.reset()
+        start = time.time()
+        function()
+        seconds = time.time() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, sum(pm.calls.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the importers against a fake Maya.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000], help="number of inputs per run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best one counts (default: 3)")
+    parser.add_argument("--output", help="csv file to write the results to")
+    options = parser.parse_args(argv)
+
+    checkStartup()
+    checkMayaFree()
+    rows = []
+    print("{0:<32}{1:>10}{2:>12}{3:>16}{4:>14}".format("function", "inputs", "seconds", "inputs/second", "pymel calls"))
+    for size in options.sizes:
+        folder = tempfile.mkdtemp(prefix="productReplacement_benchmark_")
+        try:
+            substance_folder, axf_folder = createLibrary(folder, size)
+            texture_dicts = ImportSubstanceTextures.getTextureDicts(substance_folder, use_cache=False)
+            part_list = createPartList(size)
+            checkCleanupInput(part_list)
+            checkManifest(planAll(substance_folder, axf_folder, part_list), folder)
+            manifest_path = os.path.join(folder, "benchmark.json")
+            for name, function in benchmarks(substance_folder, axf_folder, part_list, texture_dicts, manifest_path):
+                seconds, calls = timeFunction(function, options.repeat)
+                throughput = size / seconds if seconds else float("inf")
+                rows.append({"function": name, "inputs": size, "seconds": seconds, "inputs_per_second": throughput, "pymel_calls": calls})
+                print("{0:<32}{1:>10}{2:>12.4f}{3:>16.0f}{4:>14}".format(name, size, seconds, throughput, calls))
+        finally:
+            shutil.rmtree(folder)
+
+    if options.output:
+        with open(options.output, "w") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=["function", "inputs", "seconds", "inputs_per_second", "pymel_calls"], lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Tests for the AxF importer's plans against the fake Maya of the benchmarks, run with
+# python -m unittest discover tests, or pytest tests
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+repository_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_folder)
+sys.path.insert(0, os.path.join(repository_folder, "benchmarks"))
+
+import fake_maya
+fake_maya.install()
+
+import Import_AxF
+from ScenePlan import readManifest
+
+
+class FakeLineEdit(object):
+    def __init__(self, text):
+        self._text = text
+
+    def text(self):
+        return self._text
+
+
+class FakeImporter(object):
+    # the attributes of the AxFImporter dialog exportPlan uses, the real dialog needs a real Qt
+    def __init__(self, search_path):
+        self.inputfield_lne = FakeLineEdit(search_path)
+
+
+class ExportPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for name in ("fabric-01.axf", "leather.axf"):
+            open(os.path.join(self.folder, name), "w").close()
+        self.manifest_path = os.path.join(self.folder, "plans", "axf.json")
+        manifest_path = self.manifest_path
+
+        class FakeFileDialog(object):
+            DontUseNativeDialog = 0
+
+            @staticmethod
+            def getSaveFileName(*args, **kwargs):
+                return manifest_path, ""
+        Import_AxF.QtWidgets.QFileDialog = FakeFileDialog
+        self.reports = os.environ.get("PRODUCT_REPLACEMENT_REPORTS")
+        os.environ["PRODUCT_REPLACEMENT_REPORTS"] = "off"
+
+    def tearDown(self):
+        del Import_AxF.QtWidgets.QFileDialog
+        if self.reports is None:
+            del os.environ["PRODUCT_REPLACEMENT_REPORTS"]
+        else:
+            os.environ["PRODUCT_REPLACEMENT_REPORTS"] = self.reports
+        shutil.rmtree(self.folder)
+
+    def testLayersAreNamedLikeApply(self):
+        # Apply names the layers after the created material nodes, an exported manifest must do the same
+        Import_AxF.AxFImporter.__dict__["exportPlan"](FakeImporter(self.folder))
+        plans = readManifest(self.manifest_path)["plans"]
+        layers = [layer[0] for plan in plans if plan.render_layers for layer in plan.render_layers]
+        self.assertEqual(layers, ["Maya_AxF_fabric_01", "Maya_AxF_leather"])
+        materials = [name for key, node_type, name, flags in plans[0].nodes]
+        self.assertEqual(["Maya_" + name for name in materials], layers)
+
+
+if __name__ == "__main__":
+    unittest.main()
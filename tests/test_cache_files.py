@@ -0,0 +1,61 @@
+# Tests for the files the caches, the asset index and the thumbnails write, run with
+# python -m unittest discover tests, or pytest tests
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+repository_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_folder)
+
+from ScanCache import saveJson
+from AssetRegistry import AssetRegistry
+from Thumbnails import libraryFolderName
+
+
+class SaveJsonTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def testWritesAndReplaces(self):
+        path = os.path.join(self.folder, "cache", "index.json")
+        self.assertTrue(saveJson(path, {"a": 1}))
+        self.assertTrue(saveJson(path, {"a": 2}))
+        with open(path) as json_file:
+            self.assertEqual(json.load(json_file), {"a": 2})
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["index.json"])
+
+    def testUnwritablePath(self):
+        blocker = os.path.join(self.folder, "file")
+        open(blocker, "w").close()
+        self.assertFalse(saveJson(os.path.join(blocker, "index.json"), {"a": 1}))
+
+
+class AssetRegistryTest(unittest.TestCase):
+    def testUnwritableIndexStillFindsAssets(self):
+        folder = tempfile.mkdtemp()
+        try:
+            blocker = os.path.join(folder, "file")
+            open(blocker, "w").close()
+            registry = AssetRegistry([repository_folder], index_path=os.path.join(blocker, "assetIndex.json"))
+            self.assertEqual(registry.get("ShaderBall").name, "ShaderBall")
+        finally:
+            shutil.rmtree(folder)
+
+
+class LibraryFolderNameTest(unittest.TestCase):
+    def testLibrariesWithTheSameNameGetTheirOwnFolder(self):
+        first, second = libraryFolderName("/libraries/a/wood"), libraryFolderName("/libraries/b/wood/")
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("wood_") and second.startswith("wood_"))
+        self.assertEqual(libraryFolderName("/libraries/a/wood/"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
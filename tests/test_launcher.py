@@ -0,0 +1,84 @@
+# Tests for Launcher.show against the fake Maya of the benchmarks, run with
+# python -m unittest discover tests, or pytest tests
+
+import os
+import sys
+import unittest
+
+repository_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_folder)
+sys.path.insert(0, os.path.join(repository_folder, "benchmarks"))
+
+import fake_maya
+fake_maya.install()
+
+import Instrument
+import Launcher
+
+
+class FakeDialog(object):
+    # stands in for a tool dialog, building the real ones needs a real Qt
+    instances = []
+
+    def __init__(self):
+        self.shown = 0
+        self.refreshed = 0
+        FakeDialog.instances.append(self)
+
+    def refresh(self):
+        self.refreshed += 1
+
+    def show(self):
+        self.shown += 1
+
+    def raise_(self):
+        pass
+
+    def activateWindow(self):
+        pass
+
+
+class LauncherTest(unittest.TestCase):
+    def setUp(self):
+        self.reports = os.environ.get("PRODUCT_REPLACEMENT_REPORTS")
+        os.environ["PRODUCT_REPLACEMENT_REPORTS"] = "off"
+        self.is_valid = sys.modules["shiboken2"].isValid
+        sys.modules["shiboken2"].isValid = lambda dialog: True
+        Launcher.tools["fake"] = (__name__, "FakeDialog")
+        Launcher._dialogs.clear()
+        FakeDialog.instances = []
+
+    def tearDown(self):
+        del Launcher.tools["fake"]
+        Launcher._dialogs.clear()
+        sys.modules["shiboken2"].isValid = self.is_valid
+        if self.reports is None:
+            del os.environ["PRODUCT_REPLACEMENT_REPORTS"]
+        else:
+            os.environ["PRODUCT_REPLACEMENT_REPORTS"] = self.reports
+
+    def testShowReusesDialog(self):
+        # the launcher's runs are added to this one, so its report has the stages of both calls
+        with Instrument.run("LauncherTest") as report:
+            first = Launcher.show("fake")
+            second = Launcher.show("fake")
+        self.assertIs(first, second)
+        self.assertEqual(len(FakeDialog.instances), 1)
+        self.assertEqual(first.refreshed, 1)
+        self.assertEqual(first.shown, 2)
+        runs = dict((name, stage.runs) for name, stage in report.stages.items())
+        self.assertEqual(runs, {"import": 1, "construct": 1, "refresh": 1, "show": 2})
+
+    def testShowRebuildsDeletedDialog(self):
+        first = Launcher.show("fake")
+        sys.modules["shiboken2"].isValid = lambda dialog: False
+        second = Launcher.show("fake")
+        self.assertIsNot(first, second)
+        self.assertEqual(first.refreshed, 0)
+
+    def testUnknownTool(self):
+        self.assertRaises(KeyError, Launcher.show, "unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
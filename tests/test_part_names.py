@@ -0,0 +1,80 @@
+# Property tests for MUSPlan.iter_part_names on random pasted lists and tests for the blend
+# materials planned for the parts, run with python -m unittest discover tests, or pytest tests
+
+import os
+import sys
+import random
+import string
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MUSPlan import iter_part_names, plan_blend_materials
+
+allowed_chars = set(string.ascii_letters + string.digits + "_-")
+alphabet = string.ascii_letters + string.digits + u" _-,.#&()\t\r\n\u00e9"
+
+
+def randomText(generator):
+    return "".join(generator.choice(alphabet) for _ in range(generator.randint(0, 200)))
+
+
+def randomPartName(generator):
+    # a name iter_part_names keeps as it is
+    first = generator.choice(string.ascii_letters)
+    return first + "".join(generator.choice(string.ascii_letters + string.digits + "_-") for _ in range(generator.randint(0, 12)))
+
+
+class IterPartNamesTest(unittest.TestCase):
+    def setUp(self):
+        self.generator = random.Random(0)
+
+    def testEmptyInput(self):
+        self.assertEqual(list(iter_part_names("")), [])
+
+    def testNamesAreUnique(self):
+        for _ in range(500):
+            names = list(iter_part_names(randomText(self.generator)))
+            self.assertEqual(len(names), len(set(names)))
+
+    def testNamesOnlyHaveAllowedCharacters(self):
+        for _ in range(500):
+            for name in iter_part_names(randomText(self.generator)):
+                self.assertTrue(name)
+                self.assertTrue(set(name) <= allowed_chars, name)
+
+    def testNamesDontStartWithDigitOrSeparator(self):
+        for _ in range(500):
+            for name in iter_part_names(randomText(self.generator)):
+                self.assertNotIn(name[0], string.digits + "_-", name)
+
+    def testKeepsInputOrder(self):
+        # valid names separated by commas and line breaks come out in the order of their first occurrence
+        for _ in range(500):
+            parts = [randomPartName(self.generator) for _ in range(self.generator.randint(0, 20))]
+            parts += [self.generator.choice(parts) for _ in range(len(parts) // 2)] if parts else []
+            text = "".join(part + self.generator.choice([",", "\n", "\r\n", ",\n"]) for part in parts)
+            expected = []
+            for part in parts:
+                if part not in expected:
+                    expected.append(part)
+            self.assertEqual(list(iter_part_names(text)), expected)
+
+
+class PlanBlendMaterialsTest(unittest.TestCase):
+    def testHyphenatedPartAvoidsTakenNames(self):
+        # M6-bolt is created as rs_01_M6_bolt, so that is the name that has to be free
+        taken_names = set(["rs_01_M6_bolt", "rs_01_M6_boltSG"])
+        plan = plan_blend_materials(["M6-bolt"], taken_names, geo_parts={"M6_bolt": "|GEO|M6_bolt"})
+        self.assertEqual([name for key, node_type, name, flags in plan.nodes], ["rs_01_M6_bolt1"])
+        self.assertEqual([name for key, name in plan.shading_groups], ["rs_01_M6_boltSG1"])
+        self.assertEqual(plan.members, [["rs_01_M6_boltSG1", ["|GEO|M6_bolt"]]])
+        self.assertTrue(set(["rs_01_M6_bolt1", "rs_01_M6_boltSG1"]) <= taken_names)
+
+    def testNamesAreNumberedInOrder(self):
+        plan = plan_blend_materials(["body", "wheel"], set())
+        self.assertEqual([name for key, node_type, name, flags in plan.nodes], ["rs_01_body", "rs_02_wheel"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+# Tests for the node graph SubstancePlan.planMaterials builds, the MEL ScenePlan.applyPlan sends
+# and the incremental update, against the fake Maya of the benchmarks. Run with
+# python -m unittest discover tests, or pytest tests
+
+import os
+import sys
+import collections
+import unittest
+
+repository_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_folder)
+sys.path.insert(0, os.path.join(repository_folder, "benchmarks"))
+
+import fake_maya
+fake_maya.install()
+
+import ScenePlan
+from ScenePlan import applyPlan, melString, melSetAttr, validNodeName
+from SubstancePlan import SceneSnapshot, planMaterials, p2d_connections
+from ShaderRules import getRules
+from TextureScan import Texture
+
+
+def textureIndex(material, map_types, folder="/library"):
+    # material -> {map_type: Texture} like TextureScan makes it, the files don't have to exist
+    maps = collections.OrderedDict()
+    for map_type in map_types:
+        name = "{0}_{1}".format(material, map_type)
+        maps[map_type] = Texture(name, "{0}/{1}.png".format(folder, name), material, map_type)
+    return collections.OrderedDict([(material, maps)])
+
+
+def nodeTypes(plan):
+    return dict((key, node_type) for key, node_type, name, flags in plan.nodes)
+
+
+def attributes(plan):
+    return dict(((key, attribute), value) for key, attribute, value in plan.attributes)
+
+
+def connections(plan):
+    return set("{0}.{1} {2}.{3}".format(*connection[:4]) for connection in plan.connections)
+
+
+class RecordingPyMEL(fake_maya.FakePyMEL):
+    # the fake pymel.core, keeping every MEL script it is given
+    def __init__(self):
+        fake_maya.FakePyMEL.__init__(self)
+        self.scripts = []
+        evaluate = self.mel.eval
+
+        def record(script):
+            self.scripts.append(script)
+            return evaluate(script)
+        self.mel.eval = record
+
+
+class PlanMaterialsTest(unittest.TestCase):
+    def setUp(self):
+        self.rules = getRules("redshift")
+
+    def testMaterial(self):
+        plan = planMaterials(textureIndex("wood", ["basecolor", "roughness"]), rules=self.rules)
+        self.assertEqual(plan.plugins, ["redshift4maya"])
+        self.assertEqual(nodeTypes(plan)["rs_wood"], "RedshiftMaterial")
+        values = attributes(plan)
+        self.assertEqual(values[("rs_wood", "refl_fresnel_mode")], 2)
+        self.assertEqual(values[("rs_wood", "refl_brdf")], 1)
+        self.assertEqual(values[("wood_basecolor", "colorSpace")], "sRGB")
+        self.assertEqual(values[("wood_roughness", "colorSpace")], "Raw")
+        self.assertEqual(values[("wood_basecolor", "fileTextureName")], "/library/wood_basecolor.png")
+        self.assertIn("wood_basecolor.outColor rs_wood.diffuse_color", connections(plan))
+        self.assertIn("wood_roughness.outAlpha rs_wood.refl_roughness", connections(plan))
+
+    def testFileNodesShareOnePlace2dTexture(self):
+        plan = planMaterials(textureIndex("wood", ["basecolor", "roughness", "metallic"]), rules=self.rules)
+        p2ds = [key for key, node_type in nodeTypes(plan).items() if node_type == "place2dTexture"]
+        self.assertEqual(p2ds, ["rs_wood_p2d"])
+        for file_node in ("wood_basecolor", "wood_roughness", "wood_metallic"):
+            for p2d_attribute, file_attribute in p2d_connections:
+                self.assertIn("rs_wood_p2d.{0} {1}.{2}".format(p2d_attribute, file_node, file_attribute), connections(plan))
+
+    def testBumpMapsGoThroughOneBlender(self):
+        # height comes before normal in the rules, so it is the base input whatever order the maps are found in
+        plan = planMaterials(textureIndex("wood", ["normal", "height"]), rules=self.rules)
+        types = nodeTypes(plan)
+        self.assertEqual(sorted(key for key, node_type in types.items() if node_type == "RedshiftBumpBlender"), ["rs_wood_bump_input_bb"])
+        self.assertEqual(types["wood_height_bm"], "RedshiftBumpMap")
+        self.assertEqual(types["wood_normal_bm"], "RedshiftBumpMap")
+        values = attributes(plan)
+        self.assertEqual(values[("rs_wood_bump_input_bb", "additive")], 1)
+        self.assertEqual(values[("wood_height_bm", "inputType")], 0)
+        self.assertEqual(values[("wood_normal_bm", "inputType")], 1)
+        self.assertEqual(values[("rs_wood_bump_input_bb", "bumpWeight0")], 1)
+        self.assertTrue({"rs_wood_bump_input_bb.outColor rs_wood.bump_input",
+                         "wood_height_bm.out rs_wood_bump_input_bb.baseInput",
+                         "wood_normal_bm.out rs_wood_bump_input_bb.bumpInput0",
+                         "wood_height.outColor wood_height_bm.input",
+                         "wood_normal.outColor wood_normal_bm.input"} <= connections(plan))
+
+    def testNodeNamesAreValid(self):
+        plan = planMaterials(textureIndex("Fabric-01", ["basecolor"]), rules=self.rules)
+        names = [name for key, node_type, name, flags in plan.nodes]
+        self.assertEqual(names, ["rs_Fabric_01", "rs_Fabric_01_p2d", "Fabric_01_basecolor"])
+
+
+class MelTest(unittest.TestCase):
+    def testMelString(self):
+        self.assertEqual(melString('a "b" c'), '"a \\"b\\" c"')
+        self.assertEqual(melString("C:\\maps\\wood.png"), '"C:\\\\maps\\\\wood.png"')
+        self.assertEqual(melString("a\nb\tc\r"), '"a\\nb\\tc\\r"')
+
+    def testMelSetAttr(self):
+        self.assertEqual(melSetAttr("file1.colorSpace", "sRGB"), 'setAttr -type "string" "file1.colorSpace" "sRGB";')
+        self.assertEqual(melSetAttr("rs_wood.refl_brdf", 1), 'setAttr "rs_wood.refl_brdf" 1;')
+        self.assertEqual(melSetAttr("rs_wood.refl_brdf", True), 'setAttr "rs_wood.refl_brdf" 1;')
+        self.assertEqual(melSetAttr("rs_wood.diffuse_color", (0.5, 0.25, 1.0)), 'setAttr "rs_wood.diffuse_color" 0.5 0.25 1.0;')
+
+
+class ApplyPlanTest(unittest.TestCase):
+    def testCreatesNodesAndResolvesRenamedOnes(self):
+        pm = RecordingPyMEL()
+        pm.nodes["rs_wood"] = fake_maya.FakeNode("rs_wood", "RedshiftMaterial")
+        plan = planMaterials(textureIndex("wood", ["basecolor"], folder='C:\\maps "new"'), rules=getRules("redshift"))
+        created = applyPlan(plan, pm=pm)
+        # Maya renamed the material, the edit script uses the name it got
+        self.assertEqual(created["rs_wood"], "rs_wood1")
+        self.assertEqual(len(pm.scripts), 2)
+        edit_script = pm.scripts[1]
+        self.assertIn('connectAttr "wood_basecolor.outColor" "rs_wood1.diffuse_color";', edit_script)
+        self.assertIn('setAttr -type "string" "wood_basecolor.fileTextureName" "C:\\\\maps \\"new\\"/wood_basecolor.png";', edit_script)
+        self.assertNotIn('"rs_wood.', edit_script)
+
+    def testSplitsLongScripts(self):
+        pm = RecordingPyMEL()
+        plan = ScenePlan.ScenePlan()
+        for i in range(5):
+            plan.addNode("node{0}".format(i), "place2dTexture", asUtility=True)
+        batch_size = ScenePlan.mel_batch_size
+        ScenePlan.mel_batch_size = 2
+        try:
+            created = applyPlan(plan, pm=pm)
+        finally:
+            ScenePlan.mel_batch_size = batch_size
+        self.assertEqual(sorted(created.values()), ["node{0}".format(i) for i in range(5)])
+        self.assertEqual(len(pm.scripts), 3)
+
+
+class MaterialUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.rules = getRules("redshift")
+
+    def snapshot(self, texture_index):
+        # the scene right after texture_index was imported
+        scene = SceneSnapshot()
+        for material_name, maps in texture_index.items():
+            material = validNodeName(self.rules.material_prefix + material_name)
+            scene.materials.add(material)
+            scene.p2ds[material] = material + "_p2d"
+            for texture in maps.values():
+                scene.file_nodes[validNodeName(texture.name)] = (texture.path, "")
+                rule = self.rules.maps[texture.map_type]
+                scene.slot_inputs.setdefault(material, {})[rule.slot] = [validNodeName(texture.name), 1]
+        return scene
+
+    def testUnchangedMaterialPlansNothing(self):
+        texture_index = textureIndex("Fabric-01", ["basecolor", "roughness"])
+        plan = planMaterials(texture_index, scene=self.snapshot(texture_index), rules=self.rules)
+        self.assertEqual((plan.nodes, plan.existing, plan.attributes, plan.connections), ([], [], [], []))
+
+    def testAddsMissingMap(self):
+        scene = self.snapshot(textureIndex("Fabric-01", ["basecolor"]))
+        plan = planMaterials(textureIndex("Fabric-01", ["basecolor", "roughness"]), scene=scene, rules=self.rules)
+        self.assertEqual([key for key, node_type, name, flags in plan.nodes], ["Fabric-01_roughness"])
+        self.assertEqual(dict(plan.existing), {"rs_Fabric-01": "rs_Fabric_01", "rs_Fabric_01_p2d": "rs_Fabric_01_p2d",
+                                               "Fabric_01_basecolor": "Fabric_01_basecolor"})
+        self.assertIn("rs_Fabric_01_p2d.outUV Fabric-01_roughness.uvCoord", connections(plan))
+        self.assertIn("Fabric-01_roughness.outAlpha rs_Fabric-01.refl_roughness", connections(plan))
+
+    def testRepointsMovedTexture(self):
+        scene = self.snapshot(textureIndex("wood", ["basecolor"]))
+        plan = planMaterials(textureIndex("wood", ["basecolor"], folder="/moved"), scene=scene, rules=self.rules)
+        self.assertEqual(plan.nodes, [])
+        self.assertEqual(attributes(plan)[("wood_basecolor", "fileTextureName")], "/moved/wood_basecolor.png")
+        self.assertEqual(plan.connections, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+# Tests for TextureConvert with a python one-liner as the converter, run with
+# python -m unittest discover tests, or pytest tests
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TextureConvert import convertTextures
+from TextureScan import Texture
+
+copy_converter = {"command": [sys.executable, "-c", "import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])", "{source}", "{output}"],
+                  "extension": ".tx"}
+
+
+class ConvertTexturesTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = os.environ.get("PRODUCT_REPLACEMENT_TEXTURE_CACHE")
+        self.textures = []
+        for map_type in ("basecolor", "roughness"):
+            path = os.path.join(self.folder, "wood_{0}.png".format(map_type))
+            with open(path, "w") as texture_file:
+                texture_file.write(map_type)
+            # old enough for the hash index to keep it
+            os.utime(path, (time.time() - 60, time.time() - 60))
+            self.textures.append(Texture("wood_" + map_type, path, "wood", map_type))
+
+    def tearDown(self):
+        if self.cache is None:
+            os.environ.pop("PRODUCT_REPLACEMENT_TEXTURE_CACHE", None)
+        else:
+            os.environ["PRODUCT_REPLACEMENT_TEXTURE_CACHE"] = self.cache
+        shutil.rmtree(self.folder)
+
+    def testConverts(self):
+        os.environ.pop("PRODUCT_REPLACEMENT_TEXTURE_CACHE", None)
+        converted = convertTextures(self.textures, copy_converter, workers=2)
+        cache_folder = os.path.join(self.folder, ".converted")
+        self.assertEqual([os.path.dirname(texture.path) for texture in converted], [cache_folder, cache_folder])
+        self.assertTrue(all(os.path.exists(texture.path) for texture in converted))
+        self.assertEqual(sorted(name for name in os.listdir(cache_folder) if not name.endswith(".tx")), ["hashes.json"])
+
+    def testUnwritableCacheKeepsSources(self):
+        blocker = os.path.join(self.folder, "file")
+        open(blocker, "w").close()
+        os.environ["PRODUCT_REPLACEMENT_TEXTURE_CACHE"] = os.path.join(blocker, "cache")
+        converted = convertTextures(self.textures, copy_converter, workers=2)
+        self.assertEqual([texture.path for texture in converted], [texture.path for texture in self.textures])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# Tests for the texture name parsing and the folder crawl of TextureScan, run with
+# python -m unittest discover tests, or pytest tests
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from multiprocessing.pool import ThreadPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import TextureScan
+from TextureScan import crawlTextureIndexes, parseTextureName, parseTextures, resolutionRank
+
+map_types = ["basecolor", "roughness"]
+
+
+class ParseTextureNameTest(unittest.TestCase):
+    def parse(self, filename):
+        texture = parseTextureName("/maps", filename)
+        return texture and (texture.material, texture.map_type, texture.resolution, texture.tiles)
+
+    def testPlainName(self):
+        self.assertEqual(self.parse("wood_basecolor.png"), ("wood", "basecolor", "", []))
+        self.assertEqual(self.parse("dark_oak_Roughness.exr"), ("dark_oak", "Roughness", "", []))
+
+    def testResolutionTier(self):
+        self.assertEqual(self.parse("wood_basecolor_2k.png"), ("wood", "basecolor", "2k", []))
+        self.assertEqual(self.parse("wood_basecolor_8K.exr"), ("wood", "basecolor", "8k", []))
+
+    def testPixelSizeIsAResolution(self):
+        self.assertEqual(self.parse("wood_basecolor_1024.png"), ("wood", "basecolor", "1024", []))
+        self.assertEqual(self.parse("wood_basecolor_2048.png"), ("wood", "basecolor", "2048", []))
+
+    def testUdimTile(self):
+        self.assertEqual(self.parse("wood_basecolor.1001.exr"), ("wood", "basecolor", "", ["1001"]))
+        self.assertEqual(self.parse("wood_basecolor_4k.1012.exr"), ("wood", "basecolor", "4k", ["1012"]))
+
+    def testNotAMap(self):
+        self.assertIsNone(self.parse("wood.png"))
+        self.assertIsNone(self.parse("wood_basecolor.tif"))
+        self.assertIsNone(self.parse("wood_2k.png"))
+
+    def testUdimSet(self):
+        textures = parseTextures("/maps", ["wood_basecolor.1001.exr", "wood_basecolor.1002.exr", "wood_basecolor_1024.exr"])
+        self.assertEqual([(texture.name, texture.resolution, len(texture.tiles)) for texture in textures],
+                         [("wood_basecolor", "", 2), ("wood_basecolor", "1024", 0)])
+
+
+class ResolutionRankTest(unittest.TestCase):
+    def best(self, resolutions, preferred=None):
+        return min(resolutions, key=lambda resolution: resolutionRank(resolution, preferred))
+
+    def testWithoutPreference(self):
+        self.assertEqual(self.best(["2k", "", "8k"]), "")
+        self.assertEqual(self.best(["2k", "8k", "4k"]), "8k")
+
+    def testPreferredTier(self):
+        self.assertEqual(self.best(["1k", "2k", "8k", ""], "2k"), "2k")
+        self.assertEqual(self.best(["1k", "8k", ""], "4k"), "1k")
+        self.assertEqual(self.best(["8k", ""], "4k"), "")
+        self.assertEqual(self.best(["16k", "8k"], "4k"), "8k")
+
+    def testPixelSizesAreTiers(self):
+        self.assertEqual(resolutionRank("2048", "2k"), resolutionRank("2k", "2k"))
+        self.assertEqual(self.best(["1024", "4096"], "2k"), "1024")
+        self.assertEqual(self.best(["1024", "2k"]), "2k")
+
+
+class CrawlTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, *parts):
+        path = os.path.join(self.root, *parts)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        open(path, "w").close()
+
+    def testCrawlsSubfolders(self):
+        self.write("wood", "wood_basecolor.png")
+        self.write("metal", "steel", "steel_roughness.png")
+        folders = sorted(os.path.relpath(folder, self.root) for folder, index in crawlTextureIndexes(self.root, map_types))
+        self.assertEqual(folders, ["metal" + os.sep + "steel", "wood"])
+
+    def testMissingRootRaisesWithoutLeakingThreads(self):
+        # every pool the crawl starts must be terminated again, also when the root can't be listed
+        pools = []
+
+        class RecordingPool(ThreadPool):
+            def __init__(self, *args, **kwargs):
+                ThreadPool.__init__(self, *args, **kwargs)
+                self.terminated = False
+                pools.append(self)
+
+            def terminate(self):
+                self.terminated = True
+                ThreadPool.terminate(self)
+
+        TextureScan.ThreadPool = RecordingPool
+        try:
+            self.assertRaises(OSError, list, crawlTextureIndexes(os.path.join(self.root, "missing"), map_types, workers=4))
+            self.write("wood", "wood_basecolor.png")
+            list(crawlTextureIndexes(self.root, map_types, workers=4))
+        finally:
+            TextureScan.ThreadPool = ThreadPool
+        self.assertTrue(pools)
+        self.assertTrue(all(pool.terminated for pool in pools))
+        for pool in pools:
+            pool.join()
+
+
+if __name__ == "__main__":
+    unittest.main()